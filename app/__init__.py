@@ -1,6 +1,3 @@
 """
-Database models and initialization
+TaskFlow - task scheduling and automation platform
 """
-from app.models.init import Base, Task, TaskLog, init_db, get_db, SessionLocal
-
-__all__ = ["Base", "Task", "TaskLog", "init_db", "get_db", "SessionLocal"]
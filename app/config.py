@@ -12,6 +12,10 @@ class Settings(BaseSettings):
     max_workers: int = 10
     job_defaults_coalesce: bool = True
     job_defaults_max_instances: int = 1
+    # Write a "running" task_logs row before execution. Off by default:
+    # it doubles writes per run, and Task.is_running already carries the
+    # in-flight state for the UI.
+    log_running_state: bool = False
     
     # Security
     secret_key: str = "your-secret-key-change-in-production"
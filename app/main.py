@@ -1,71 +1,160 @@
 """ Task Scheduler - Main Application """
 
 from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from contextlib import asynccontextmanager
+from jinja2 import FileSystemBytecodeCache
+import asyncio
 import os
+import time
 
-from app.models import init_db
-try:
-    init_db()
-    print("Database initialized successfully")
-except Exception as e:
-    print(f"Database initialization failed: {e}")
-    raise
+import orjson
 
-from app.models import SessionLocal, get_db as get_db_session
-print(f"SessionLocal imported: {SessionLocal}")
+import re
 
+from sqlalchemy import select
+
+from app.config import settings
+from app.routers import ai, tasks
 from app.routers import tasks_router, ai_router, messages_router
 from app.services.scheduler import TaskSchedulerService
+from app.services.ai_batcher import AIBatcher
 from app.services.ai_service import AIService
 
-db_session = SessionLocal()
-scheduler_service = TaskSchedulerService(db_session)
-ai_service = AIService()
+# AIService enumerates Ollama models on construction (a network call),
+# so build it lazily: workers that never serve an AI route skip it.
+_ai_service = None
+
+
+def get_ai_service() -> AIService:
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+        status = _ai_service.get_status()
+        if status["available"]:
+            print(f"AI service started, model: {status['model']}")
+            print(f"Available models: {', '.join(status['available_models'])}")
+        else:
+            print("AI service not started, using rule mode")
+    return _ai_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Construct everything post-fork: under multi-worker deployments,
+    # module-level engines and sessions would be created pre-fork and
+    # shared across workers.
+    from app.models import init_db
+    try:
+        init_db()
+        print("Database initialized successfully")
+    except Exception as e:
+        print(f"Database initialization failed: {e}")
+        raise
+
+    from app.models import SessionLocal, SessionLocalRO, Task
+
+    scheduler_service = TaskSchedulerService(SessionLocal)
+    app.state.session_factory = SessionLocal
+    app.state.scheduler_service = scheduler_service
+    app.state.get_ai_service = get_ai_service
+
+    ai_batcher = AIBatcher(get_ai_service)
+    app.state.ai_batcher = ai_batcher
+
     scheduler_service.start()
-    tasks_router.set_scheduler_service(scheduler_service)
-    ai_router.set_ai_service(ai_service)
-
-    status = ai_service.get_status()
-    if status["available"]:
-        print(f"AI service started, model: {status['model']}")
-        print(f"Available models: {', '.join(status['available_models'])}")
-    else:
-        print("AI service not started, using rule mode")
-
-    from app.models import Task
-    db = SessionLocal()
-    all_tasks = db.query(Task).all()
-    for task in all_tasks:
-        await scheduler_service.add_task(task)
+    ai_batcher.start()
+    tasks.set_scheduler_service(scheduler_service)
+    ai.set_ai_service_factory(get_ai_service)
+    ai.set_ai_batcher(ai_batcher)
+
+    # Stream tasks in bounded batches so startup memory stays flat even
+    # with thousands of rows. Selecting just the columns the scheduler
+    # needs skips ORM instance construction and identity-map bookkeeping.
+    # Read from the RO pool: the streaming cursor stays open across each
+    # add_tasks_bulk await, which needs the write pool's one connection.
+    db = SessionLocalRO()
+    result = db.execute(
+        select(Task.id, Task.name, Task.cron_expression, Task.is_active)
+        .where(Task.is_active == True)
+        .execution_options(yield_per=500)
+    )
+    for batch in result.partitions(500):
+        await scheduler_service.add_tasks_bulk(batch)
     db.close()
 
+    health_refresher = asyncio.create_task(_refresh_health(app))
+
     yield
 
+    health_refresher.cancel()
+    ai_batcher.stop()
     scheduler_service.shutdown()
-    db_session.close()
+    await scheduler_service.executor.aclose()
 
 
 app = FastAPI(
     title="Task Scheduler",
     description="A modern task scheduling and automation platform with AI",
     version="1.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that sets Cache-Control headers.
+
+    Content-hashed filenames (e.g. app.3f2a1b9c.js) never change, so they
+    get a one-year immutable lifetime; everything else gets 5 minutes.
+    """
 
-app.include_router(tasks_router)
-app.include_router(ai_router)
-app.include_router(messages_router)
+    _hashed_name = re.compile(r"\.[0-9a-f]{8,}\.")
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if self._hashed_name.search(os.path.basename(str(full_path))):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+
+
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
+
+# Cache compiled templates on disk so renders skip parse+compile after
+# the first hit; only re-check template files on disk in DEBUG.
+_jinja_cache_dir = "./data/jinja_cache"
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+templates = Jinja2Templates(
+    directory="app/templates",
+    bytecode_cache=FileSystemBytecodeCache(_jinja_cache_dir),
+    auto_reload=settings.log_level.upper() == "DEBUG"
+)
+
+def register_routes(app: FastAPI):
+    """Attach all API routers; kept in one place so the route table is
+    built exactly once per worker."""
+    app.include_router(tasks_router)
+    app.include_router(ai_router)
+    app.include_router(messages_router)
+
+
+register_routes(app)
+
+# Dev-only: flag lazy-load (N+1) regressions as soon as relationships appear.
+# Importing the extension patches SQLAlchemy to log every lazy load.
+if settings.log_level.upper() == "DEBUG":
+    try:
+        import nplusone.ext.sqlalchemy  # noqa: F401
+        print("nplusone lazy-load detection enabled")
+    except ImportError:
+        print("nplusone not installed, lazy-load detection disabled")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -98,16 +187,76 @@ async def messages_page(request: Request):
     return templates.TemplateResponse("messages.html", {"request": request})
 
 
+# Health probes hit this endpoint every few seconds; cache the AI status
+# probe (10s) and the job enumeration (1s, APScheduler locks internally)
+# so the handler stays a pure in-memory read.
+_ai_status_cache = (None, 0.0)
+_jobs_count_cache = (None, 0.0)
+
+
+def _cached_ai_available(ai_service) -> bool:
+    global _ai_status_cache
+    value, expires_at = _ai_status_cache
+    now = time.monotonic()
+    if value is None or now >= expires_at:
+        value = ai_service.get_status()["available"]
+        _ai_status_cache = (value, now + 10.0)
+    return value
+
+
+def _cached_jobs_count(scheduler_service) -> int:
+    global _jobs_count_cache
+    value, expires_at = _jobs_count_cache
+    now = time.monotonic()
+    if value is None or now >= expires_at:
+        value = len(scheduler_service.get_scheduler_jobs())
+        _jobs_count_cache = (value, now + 1.0)
+    return value
+
+
+_health_bytes = orjson.dumps({"status": "starting"})
+
+
+async def _refresh_health(app: FastAPI):
+    """Re-serialize the health payload once per second so the endpoint
+    itself is a constant-bytes response."""
+    global _health_bytes
+    scheduler_service = app.state.scheduler_service
+    while True:
+        try:
+            # Don't force AI init from the health tick; report unavailable
+            # until some AI request has constructed the service.
+            ai_available = _cached_ai_available(_ai_service) if _ai_service else False
+            _health_bytes = orjson.dumps({
+                "status": "healthy",
+                "scheduler_running": scheduler_service.scheduler.running,
+                "scheduled_jobs": _cached_jobs_count(scheduler_service),
+                "ai_available": ai_available
+            })
+        except Exception as e:
+            print(f"Health refresh failed: {e}")
+        await asyncio.sleep(1)
+
+
 @app.get("/api/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "scheduler_running": scheduler_service.scheduler.running,
-        "scheduled_jobs": len(scheduler_service.get_scheduler_jobs()),
-        "ai_available": ai_service.get_status()["available"]
-    }
+    return Response(content=_health_bytes, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single worker: the lifespan starts an in-process AsyncIOScheduler
+    # on a MemoryJobStore, so N workers would each schedule every task
+    # and fire each cron N times per tick. Scaling out needs a shared
+    # jobstore plus a startup gate before workers can be raised.
+    # uvloop + httptools replace the pure-Python event loop and HTTP
+    # parser; workers need the import string, not the app object.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=1,
+        loop="uvloop",
+        http="httptools",
+        log_level=settings.log_level.lower()
+    )
@@ -1,15 +1,30 @@
 """ Database models for Task Scheduler """
 
 import os
-from datetime import datetime, timezone
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, JSON, ForeignKey
+import json
+
+from sqlalchemy import create_engine, event, func, Column, Index, Integer, String, DateTime, Text, Boolean, JSON, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+try:
+    import orjson
+
+    def _json_serializer(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_deserializer = orjson.loads
+except ImportError:
+    _json_serializer = json.dumps
+    _json_deserializer = json.loads
 
 Base = declarative_base()
 
 engine = None
+read_engine = None
 SessionLocal = None
+SessionLocalRO = None
 
 
 class Task(Base):
@@ -20,7 +35,7 @@ class Task(Base):
     description = Column(Text, nullable=True)
     task_type = Column(String(50), nullable=False)
     cron_expression = Column(String(100), nullable=False)
-    config = Column(JSON, default=lambda: dict)
+    config = Column(JSON, default=dict)
     is_active = Column(Boolean, default=True)
     is_running = Column(Boolean, default=False)
     last_run_at = Column(DateTime, nullable=True)
@@ -28,12 +43,17 @@ class Task(Base):
     notify_on_success = Column(Boolean, default=False)
     notify_on_failure = Column(Boolean, default=True)
     notification_email = Column(String(200), nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     run_count = Column(Integer, default=0)
     success_count = Column(Integer, default=0)
     failure_count = Column(Integer, default=0)
 
+    __table_args__ = (
+        # Accelerates the scheduler's "what runs next" sweep
+        Index("ix_task_active_next", "is_active", "next_run_at"),
+    )
+
 
 class TaskLog(Base):
     __tablename__ = "task_logs"
@@ -42,7 +62,7 @@ class TaskLog(Base):
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
     task_name = Column(String(100), nullable=False)
     status = Column(String(20), nullable=False)
-    started_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime, server_default=func.current_timestamp())
     completed_at = Column(DateTime, nullable=True)
     duration_ms = Column(Integer, nullable=True)
     output = Column(Text, nullable=True)
@@ -50,6 +70,15 @@ class TaskLog(Base):
     exit_code = Column(Integer, nullable=True)
     trigger_type = Column(String(20), default="scheduled")
 
+    __table_args__ = (
+        # Logs page filters by task and orders by started_at DESC;
+        # these turn that into an index-range scan instead of scan+sort
+        Index("ix_tasklog_task_started", "task_id", "started_at"),
+        Index("ix_tasklog_status_started", "status", "started_at"),
+        # Recent-logs feed orders by started_at alone
+        Index("ix_tasklog_started", "started_at"),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -66,31 +95,124 @@ class Message(Base):
     is_read = Column(Boolean, default=False)
     is_processed = Column(Boolean, default=False)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
-    message_id = Column(String(500), nullable=True, index=True)
-    received_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    message_id = Column(String(500), nullable=True, unique=True, index=True)
+    received_at = Column(DateTime, server_default=func.current_timestamp())
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+
+    __table_args__ = (
+        Index("ix_message_source_received", "source", "received_at"),
+        # Keyset pagination scans (received_at, id) ranges directly
+        Index("ix_messages_received_id", "received_at", "id"),
+    )
+
+
+class EmailImportState(Base):
+    """IMAP UID watermark per account.
+
+    Imports only fetch mail with UID above last_uid; the watermark is
+    discarded when the server's UIDVALIDITY changes (mailbox renumbered).
+    """
+    __tablename__ = "email_import_state"
+
+    id = Column(Integer, primary_key=True)
+    account = Column(String(200), nullable=False, unique=True)
+    last_uidvalidity = Column(Integer, default=0)
+    last_uid = Column(Integer, default=0)
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+class TaskStatsMV(Base):
+    """Materialized dashboard counters, refreshed by the scheduler.
+
+    Single row (id=1) so the dashboard endpoint is an O(1) fetch instead
+    of re-aggregating tasks and task_logs on every request.
+    """
+    __tablename__ = "task_stats_mv"
+
+    id = Column(Integer, primary_key=True, default=1)
+    total_tasks = Column(Integer, default=0)
+    active_tasks = Column(Integer, default=0)
+    running_tasks = Column(Integer, default=0)
+    total_runs = Column(Integer, default=0)
+    success_runs = Column(Integer, default=0)
+    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+
+def _set_sqlite_pragmas(dbapi_connection, readonly=False):
+    # WAL + NORMAL lets scheduler reads run concurrently with log writes;
+    # cache_size is in KiB when negative (-20000 = ~20MB page cache).
+    # Read-only connections skip journal/sync pragmas (they would write).
+    cursor = dbapi_connection.cursor()
+    if not readonly:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 def init_db(db_path="./data/scheduler.db"):
-    global engine, SessionLocal
-    
+    global engine, read_engine, SessionLocal, SessionLocalRO
+
     db_dir = os.path.dirname(db_path) or "."
     os.makedirs(db_dir, exist_ok=True)
-    
+
+    # Single-writer pool: SQLite serializes writers anyway, so one pooled
+    # write connection avoids SQLITE_BUSY churn between writers.
     engine = create_engine(
         f"sqlite:///{db_path}",
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        query_cache_size=1200,
+        json_serializer=_json_serializer,
+        json_deserializer=_json_deserializer,
     )
-    
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, _):
+        _set_sqlite_pragmas(dbapi_connection)
+
     Base.metadata.create_all(bind=engine)
-    
+
+    # Read pool sized to CPU count; WAL lets these run while a write is
+    # in flight. mode=ro guards against accidental writes on this path.
+    read_engine = create_engine(
+        f"sqlite:///file:{db_path}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=os.cpu_count() or 4,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        query_cache_size=1200,
+        json_serializer=_json_serializer,
+        json_deserializer=_json_deserializer,
+    )
+
+    @event.listens_for(read_engine, "connect")
+    def _on_connect_ro(dbapi_connection, _):
+        _set_sqlite_pragmas(dbapi_connection, readonly=True)
+
+    # Plain factories: FastAPI runs a dependency's setup, endpoint, and
+    # teardown on different threadpool threads, so thread-local
+    # scoped_session registries would hand one Session to two requests
+    # and close sessions out from under in-flight ones
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    SessionLocalRO = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 
 def get_db():
     if SessionLocal is None:
         raise RuntimeError("Database not initialized. Call init_db() first.")
-    
+
     db = SessionLocal()
     try:
         yield db
@@ -98,11 +220,25 @@ def get_db():
         db.close()
 
 
+def get_db_ro():
+    if SessionLocalRO is None:
+        raise RuntimeError("Database not initialized. Call init_db() first.")
+
+    db = SessionLocalRO()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 __all__ = [
     'Base',
     'Task',
     'TaskLog',
     'Message',
+    'EmailImportState',
+    'TaskStatsMV',
     'init_db',
     'get_db',
+    'get_db_ro',
 ]
@@ -1,11 +1,16 @@
 """
 Pydantic schemas for API
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
+try:
+    from croniter_rs import croniter
+except ImportError:
+    from croniter import croniter
+
 class TaskType(str, Enum):
     HTTP = "http"
     SHELL = "shell"
@@ -54,6 +59,15 @@ class TaskBase(BaseModel):
     notify_on_failure: bool = Field(default=True)
     notification_email: Optional[str] = Field(default=None)
 
+    @field_validator("cron_expression")
+    @classmethod
+    def _check_cron_expression(cls, v: str) -> str:
+        # Reject bad expressions at the schema boundary so nothing
+        # downstream (scheduler, dashboard) has to re-validate them
+        if not croniter.is_valid(v):
+            raise ValueError(f"Invalid cron expression: {v}")
+        return v
+
 class TaskCreate(TaskBase):
     pass
 
@@ -67,6 +81,13 @@ class TaskUpdate(BaseModel):
     notify_on_failure: Optional[bool] = Field(default=None)
     notification_email: Optional[str] = Field(default=None)
 
+    @field_validator("cron_expression")
+    @classmethod
+    def _check_cron_expression(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and not croniter.is_valid(v):
+            raise ValueError(f"Invalid cron expression: {v}")
+        return v
+
 class TaskResponse(TaskBase):
     id: int
     is_running: bool
@@ -130,6 +151,11 @@ class MessageResponse(MessageBase):
     class Config:
         from_attributes = True
 
+class MessageBulkUpdate(BaseModel):
+    ids: List[int]
+    is_processed: Optional[bool] = None
+    is_read: Optional[bool] = None
+
 class DashboardStats(BaseModel):
     total_tasks: int
     active_tasks: int
@@ -139,6 +165,29 @@ class DashboardStats(BaseModel):
     recent_logs: List[TaskLogResponse]
     upcoming_tasks: List[TaskResponse]
 
+# AI request schemas
+class NaturalToCronRequest(BaseModel):
+    text: str
+
+class AnalyzeErrorRequest(BaseModel):
+    error_message: str = ""
+    task_type: str = "shell"
+    output: str = ""
+
+class DescriptionRequest(BaseModel):
+    description: str
+
+class ChatRequest(BaseModel):
+    message: str
+    context: Dict[str, Any] = Field(default_factory=dict)
+
+class AIQueryRequest(BaseModel):
+    query: str
+    context: Dict[str, Any] = Field(default_factory=dict)
+
+class ExtractTasksRequest(BaseModel):
+    message: Dict[str, Any]
+
 class CronValidateRequest(BaseModel):
     expression: str
 
@@ -1,77 +1,142 @@
 """
 AI Router - AI-powered API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
+import asyncio
+import re
 
+import orjson
+
+from app.models.schemas import (
+    NaturalToCronRequest, AnalyzeErrorRequest, DescriptionRequest,
+    ChatRequest, AIQueryRequest, ExtractTasksRequest
+)
 from app.services.ai_service import AIService
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
-# Global AI service
+# Compiled once; LLM replies wrap the JSON array in prose
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+# Global AI service; either injected directly or built lazily on first use
 ai_service: AIService = None
+ai_service_factory = None
 
 def set_ai_service(service: AIService):
     global ai_service
     ai_service = service
 
+# Optional request micro-batcher (wired in lifespan)
+ai_batcher = None
+
+def set_ai_service_factory(factory):
+    global ai_service_factory
+    ai_service_factory = factory
+
+def set_ai_batcher(batcher):
+    global ai_batcher
+    ai_batcher = batcher
+
+def _get_ai_service() -> AIService:
+    global ai_service
+    if ai_service is None and ai_service_factory is not None:
+        ai_service = ai_service_factory()
+    return ai_service
+
+def get_ai_service(request: Request) -> AIService:
+    """Resolve the shared AIService singleton.
+
+    Prefers the lazy factory stored on app.state in the lifespan; falls
+    back to the module globals for callers outside a FastAPI app.
+    """
+    factory = getattr(request.app.state, "get_ai_service", None)
+    if factory is not None:
+        return factory()
+    return _get_ai_service()
+
 @router.get("/status")
-async def get_ai_status():
+async def get_ai_status(ai: AIService = Depends(get_ai_service)):
     """Get AI service status"""
-    return ai_service.get_status()
+    return ai.get_status()
 
 @router.post("/natural-to-cron")
-async def natural_to_cron(request: Dict[str, str]):
+async def natural_to_cron(request: NaturalToCronRequest, ai: AIService = Depends(get_ai_service)):
     """Convert natural language to cron expression"""
-    text = request.get("text", "")
+    text = request.text
     if not text:
         raise HTTPException(status_code=400, detail="Text is required")
     
-    result = ai_service.natural_language_to_cron(text)
-    return result
+    if ai_batcher:
+        return await ai_batcher.submit("natural_to_cron", text)
+    return await ai.natural_language_to_cron_async(text)
 
 @router.post("/analyze-error")
-async def analyze_error(request: Dict[str, Any]):
+async def analyze_error(request: AnalyzeErrorRequest, ai: AIService = Depends(get_ai_service)):
     """Analyze task error and provide suggestions"""
-    error_message = request.get("error_message", "")
-    task_type = request.get("task_type", "shell")
-    output = request.get("output", "")
-    
-    result = ai_service.analyze_error(error_message, task_type, output)
-    return result
+    error_message = request.error_message
+    task_type = request.task_type
+    output = request.output
+
+    # Rule hits return immediately; LLM analysis runs in a worker
+    # thread so it never blocks the loop
+    return await ai.analyze_error_async(error_message, task_type, output)
 
 @router.post("/suggest-config")
-async def suggest_config(request: Dict[str, str]):
+async def suggest_config(request: DescriptionRequest, ai: AIService = Depends(get_ai_service)):
     """Suggest task configuration based on description"""
-    description = request.get("description", "")
+    description = request.description
     if not description:
         raise HTTPException(status_code=400, detail="Description is required")
     
-    result = ai_service.suggest_task_config(description)
-    return result
+    if ai_batcher:
+        return await ai_batcher.submit("suggest_config", description)
+    return await ai.suggest_task_config_async(description)
 
 @router.post("/chat")
-async def chat(request: Dict[str, Any]):
+async def chat(request: ChatRequest, ai: AIService = Depends(get_ai_service)):
     """AI chat assistant"""
-    message = request.get("message", "")
-    context = request.get("context", {})
+    message = request.message
+    context = request.context
     
     if not message:
         raise HTTPException(status_code=400, detail="Message is required")
     
-    result = ai_service.chat_assistant(message, context)
-    return result
+    if ai_batcher:
+        return await ai_batcher.submit("chat", {"message": message, "context": context})
+    return await asyncio.to_thread(ai.chat_assistant, message, context)
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, ai: AIService = Depends(get_ai_service)):
+    """AI chat assistant, streamed as Server-Sent Events.
+
+    Tokens are forwarded as they arrive from the LLM, so the client sees
+    time-to-first-token latency instead of waiting for the full answer.
+    """
+    message = request.message
+    context = request.context
+
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    def event_stream():
+        for fragment in ai.chat_assistant_stream(message, context):
+            yield b"data: " + orjson.dumps({"content": fragment}) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 @router.post("/query")
-async def ai_query(request: Dict[str, Any]):
+async def ai_query(request: AIQueryRequest, ai: AIService = Depends(get_ai_service)):
     """AI query endpoint (alias for chat)"""
-    message = request.get("query", "")
-    context = request.get("context", {})
+    message = request.query
+    context = request.context
     
     if not message:
         raise HTTPException(status_code=400, detail="Query is required")
     
-    result = ai_service.chat_assistant(message, context)
+    result = await asyncio.to_thread(ai.chat_assistant, message, context)
     return {
         "success": result.get("type") != "error",
         "response": result.get("response", ""),
@@ -79,30 +144,30 @@ async def ai_query(request: Dict[str, Any]):
     }
 
 @router.post("/generate-name")
-async def generate_name(request: Dict[str, str]):
+async def generate_name(request: DescriptionRequest, ai: AIService = Depends(get_ai_service)):
     """Generate task name from description"""
-    description = request.get("description", "")
+    description = request.description
     if not description:
         raise HTTPException(status_code=400, detail="Description is required")
     
-    name = ai_service.generate_task_name(description)
-    return {"name": name}
+    if ai_batcher:
+        return {"name": await ai_batcher.submit("generate_name", description)}
+    return {"name": await ai.generate_task_name_async(description)}
 
 @router.post("/parse-task")
-async def parse_task(request: Dict[str, str]):
+async def parse_task(request: DescriptionRequest, ai: AIService = Depends(get_ai_service)):
     """Parse natural language description into task configuration"""
-    description = request.get("description", "")
+    description = request.description
     if not description:
         raise HTTPException(status_code=400, detail="Description is required")
     
-    # Get task suggestion from AI
-    suggestion = ai_service.suggest_task_config(description)
-    
-    # Get cron expression from natural language
-    cron_result = ai_service.natural_language_to_cron(description)
-    
-    # Generate task name
-    task_name = ai_service.generate_task_name(description)
+    # The three LLM calls are independent; run them concurrently so
+    # latency is max() of the round-trips instead of their sum
+    suggestion, cron_result, task_name = await asyncio.gather(
+        ai.suggest_task_config_async(description),
+        ai.natural_language_to_cron_async(description),
+        ai.generate_task_name_async(description),
+    )
     
     # Determine task type
     task_type = suggestion.get("task_type", "shell")
@@ -150,13 +215,13 @@ async def parse_task(request: Dict[str, str]):
         "success": True,
         "task": task_config,
         "cron_description": cron_result.get("description", ""),
-        "source": "llm" if ai_service.ollama_available else "rule"
+        "source": "llm" if ai.ollama_available else "rule"
     }
 
 @router.post("/extract-tasks-from-message")
-async def extract_tasks_from_message(request: Dict[str, Any]):
+async def extract_tasks_from_message(request: ExtractTasksRequest, ai: AIService = Depends(get_ai_service)):
     """Extract actionable tasks from a message using AI"""
-    message = request.get("message", {})
+    message = request.message
     if not message:
         raise HTTPException(status_code=400, detail="Message is required")
     
@@ -175,7 +240,7 @@ Content:
 {body}
 """
     
-    if not ai_service.ollama_available:
+    if not ai.ollama_available:
         # Fallback: create a single generic task
         return {
             "success": True,
@@ -214,15 +279,14 @@ Extract tasks and return as JSON array:
 If no actionable tasks found, return empty array []."""
 
     try:
-        import json
-        import re
-        
-        response = ai_service._call_llm(prompt)
-        
+        # _call_llm rate-limits with time.sleep and a blocking semaphore;
+        # keep all of that off the event loop
+        response = await asyncio.to_thread(ai._call_llm, prompt)
+
         # Extract JSON from response
-        json_match = re.search(r'\[.*\]', response, re.DOTALL)
+        json_match = _JSON_ARRAY_RE.search(response)
         if json_match:
-            tasks = json.loads(json_match.group())
+            tasks = orjson.loads(json_match.group())
         else:
             tasks = []
         
@@ -1 +1,432 @@
+"""
+Messages API Router - inbox messages imported from email
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import asyncio
+import email
+import imaplib
+import os
+import uuid
+from datetime import datetime
 
+import orjson
+from email.header import decode_header
+from email.utils import parseaddr
+
+from app import models
+from app.models import EmailImportState, Message, get_db, get_db_ro
+from app.models.schemas import MessageBulkUpdate, MessageCreate, MessageUpdate, MessageResponse
+from app.services.imap_pool import ImapPool
+
+router = APIRouter(prefix="/api/messages", tags=["messages"])
+
+EMAIL_HOST = os.getenv("EMAIL_HOST", "")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "993"))
+EMAIL_USER = os.getenv("EMAIL_USER", "")
+EMAIL_PASS = os.getenv("EMAIL_PASS", "")
+
+# Parallel IMAP connections for the fetch phase; each FETCH pays a full
+# server round-trip, so serial fetching is RTT-bound
+FETCH_CONCURRENCY = 8
+
+
+@router.get("/", response_model=List[MessageResponse], response_model_exclude_none=True)
+def list_messages(
+    skip: int = 0,
+    limit: int = 100,
+    is_processed: Optional[bool] = None,
+    is_read: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_ro)
+):
+    """List messages, newest first.
+
+    Prefer cursor pagination ("<received_at_iso>|<id>" of the last seen
+    row) over skip: OFFSET forces the database to scan and discard skip
+    rows, while the cursor seeks straight to the page.
+    """
+    query = db.query(Message)
+    if is_processed is not None:
+        query = query.filter(Message.is_processed == is_processed)
+    if is_read is not None:
+        query = query.filter(Message.is_read == is_read)
+
+    if cursor:
+        try:
+            ts_str, _, id_str = cursor.partition("|")
+            cursor_key = (datetime.fromisoformat(ts_str), int(id_str))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(Message.received_at, Message.id) < cursor_key)
+    elif skip:
+        query = query.offset(skip)
+
+    return query.order_by(Message.received_at.desc(), Message.id.desc()).limit(limit).all()
+
+
+@router.get("/export")
+def export_messages(db: Session = Depends(get_db_ro)):
+    """Export all messages as NDJSON.
+
+    Streams dict rows from a yield_per cursor instead of materializing
+    ORM objects, so memory stays flat regardless of table size.
+    """
+    def ndjson_rows():
+        result = db.execute(
+            select(
+                Message.id,
+                Message.source,
+                Message.subject,
+                Message.sender,
+                Message.sender_name,
+                Message.organization,
+                Message.is_read,
+                Message.is_processed,
+                Message.received_at,
+            )
+            .order_by(Message.id)
+            .execution_options(yield_per=500)
+        )
+        for row in result.mappings():
+            yield orjson.dumps(dict(row)) + b"\n"
+
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+
+@router.get("/{message_id}", response_model=MessageResponse)
+def get_message(message_id: int, db: Session = Depends(get_db_ro)):
+    """Get a specific message"""
+    message = db.query(Message).filter(Message.id == message_id).first()
+    if not message:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return message
+
+
+@router.post("/", response_model=MessageResponse)
+def create_message(message: MessageCreate, db: Session = Depends(get_db)):
+    """Create a message"""
+    db_message = Message(**message.model_dump())
+    db.add(db_message)
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+
+@router.patch("/bulk")
+def bulk_update_messages(payload: MessageBulkUpdate, db: Session = Depends(get_db)):
+    """Update flags on many messages with a single UPDATE ... WHERE id IN"""
+    values = {
+        field: value
+        for field, value in (("is_processed", payload.is_processed), ("is_read", payload.is_read))
+        if value is not None
+    }
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    result = db.execute(update(Message).where(Message.id.in_(payload.ids)).values(**values))
+    db.commit()
+    return {"updated": result.rowcount}
+
+
+@router.put("/{message_id}", response_model=MessageResponse)
+def update_message(message_id: int, message_update: MessageUpdate, db: Session = Depends(get_db)):
+    """Update message flags / linked task"""
+    message = db.query(Message).filter(Message.id == message_id).first()
+    if not message:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    for field, value in message_update.model_dump(exclude_unset=True).items():
+        setattr(message, field, value)
+
+    db.commit()
+    db.refresh(message)
+    return message
+
+
+@router.delete("/{message_id}")
+def delete_message(message_id: int, db: Session = Depends(get_db)):
+    """Delete a message"""
+    message = db.query(Message).filter(Message.id == message_id).first()
+    if not message:
+        raise HTTPException(status_code=404, detail="Message not found")
+
+    db.delete(message)
+    db.commit()
+    return {"message": "Message deleted successfully"}
+
+
+def _decode_header_value(value) -> str:
+    """Decode a possibly RFC2047-encoded header to text"""
+    if not value:
+        return ""
+    decoded = ""
+    for part, charset in decode_header(value):
+        if isinstance(part, bytes):
+            try:
+                decoded += part.decode(charset or "utf-8", errors="replace")
+            except LookupError:
+                decoded += part.decode("utf-8", errors="replace")
+        else:
+            decoded += part
+    return decoded
+
+
+def _extract_body(msg) -> str:
+    """Extract the text/plain body from a parsed email message"""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                payload = part.get_payload(decode=True)
+                if payload:
+                    charset = part.get_content_charset() or "utf-8"
+                    return payload.decode(charset, errors="replace")
+        return ""
+    payload = msg.get_payload(decode=True)
+    if payload:
+        charset = msg.get_content_charset() or "utf-8"
+        return payload.decode(charset, errors="replace")
+    return ""
+
+
+def _open_imap() -> imaplib.IMAP4_SSL:
+    """Open an authenticated IMAP connection on the inbox"""
+    mail = imaplib.IMAP4_SSL(EMAIL_HOST, EMAIL_PORT)
+    mail.login(EMAIL_USER, EMAIL_PASS)
+    mail.select("inbox")
+    return mail
+
+
+def _close_imap(mail):
+    try:
+        mail.close()
+    except Exception:
+        pass
+    try:
+        mail.logout()
+    except Exception:
+        pass
+
+
+def _parse_email(raw: bytes) -> dict:
+    msg = email.message_from_bytes(raw)
+    sender_name, sender_addr = parseaddr(_decode_header_value(msg.get("From")))
+    # Derive the organization from the sender domain in one pass
+    organization = sender_addr.rpartition("@")[2].partition(".")[0]
+    return {
+        "subject": _decode_header_value(msg.get("Subject")) or "(no subject)",
+        "sender": sender_addr,
+        "sender_name": sender_name,
+        "organization": organization,
+        "body": _extract_body(msg),
+        "message_id": msg.get("Message-ID"),
+    }
+
+
+# Pooled, pre-authenticated IMAP connections reused across import calls
+_imap_pool = ImapPool(_open_imap, max_size=FETCH_CONCURRENCY)
+
+
+def _get_uidvalidity(mail) -> int:
+    typ, data = mail.response("UIDVALIDITY")
+    try:
+        return int(data[0])
+    except (TypeError, ValueError, IndexError):
+        return 0
+
+
+def _uid_search(mail, last_uid: int) -> List[int]:
+    """Find UIDs of messages to import.
+
+    With a watermark this is "UID {last_uid+1}:*" — the server only
+    considers mail newer than the last run instead of the whole mailbox.
+    First run falls back to UNSEEN.
+    """
+    if last_uid:
+        status, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+    else:
+        status, data = mail.uid("SEARCH", None, "UNSEEN")
+    if status != "OK":
+        return []
+    uids = [int(uid) for uid in data[0].split()]
+    # "n:*" always matches the highest-UID message even when nothing is
+    # newer; filter so an empty mailbox delta really is empty
+    return [uid for uid in uids if uid > last_uid]
+
+
+def _fetch_email_chunk(mail, uids: List[int]) -> List[dict]:
+    """Fetch and parse a slice of emails (by UID) on the given connection"""
+    emails = []
+    for uid in uids:
+        status, msg_data = mail.uid("FETCH", str(uid), "(RFC822)")
+        if status != "OK" or not msg_data or msg_data[0] is None:
+            continue
+        emails.append(_parse_email(msg_data[0][1]))
+        mail.uid("STORE", str(uid), "+FLAGS", "\\Seen")
+    return emails
+
+
+async def _fetch_unseen_emails(last_uidvalidity: int = 0, last_uid: int = 0):
+    """Fetch new emails over pooled IMAP connections.
+
+    The SEARCH runs on one connection; the per-message FETCHes fan out
+    across up to FETCH_CONCURRENCY pooled connections so wall time is
+    bounded by the slowest chunk instead of the sum of round-trips.
+
+    Returns (emails, uidvalidity, new_last_uid) so the caller can persist
+    the watermark alongside the inserted rows.
+    """
+    async with _imap_pool.acquire() as mail:
+        uidvalidity = _get_uidvalidity(mail)
+        if uidvalidity != last_uidvalidity:
+            # Mailbox was renumbered; the old watermark no longer means
+            # anything, so start over from UNSEEN
+            last_uid = 0
+        uids = await asyncio.to_thread(_uid_search, mail, last_uid)
+
+    if not uids:
+        return [], uidvalidity, last_uid
+
+    workers = min(FETCH_CONCURRENCY, len(uids))
+    chunks = [uids[i::workers] for i in range(workers)]
+
+    async def fetch_chunk(chunk):
+        async with _imap_pool.acquire() as mail:
+            return await asyncio.to_thread(_fetch_email_chunk, mail, chunk)
+
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    emails = [item for chunk_result in results for item in chunk_result]
+    return emails, uidvalidity, max(uids)
+
+
+def _store_emails(db: Session, emails: List[dict]) -> int:
+    """Insert fetched emails, deduplicating on message_id.
+
+    One prefetch for dedup instead of a SELECT per email, then a single
+    bulk INSERT; the unique index on message_id catches races.
+    """
+    existing_ids = {
+        row[0]
+        for row in db.execute(select(Message.message_id).where(Message.message_id.isnot(None)))
+    }
+
+    rows = [
+        {
+            "source": "email",
+            "source_account": EMAIL_USER,
+            "subject": item["subject"],
+            "sender": item["sender"],
+            "sender_name": item["sender_name"],
+            "organization": item["organization"],
+            "body": item["body"],
+            "message_id": item["message_id"],
+        }
+        for item in emails
+        if not item["message_id"] or item["message_id"] not in existing_ids
+    ]
+
+    if rows:
+        db.execute(
+            sqlite_insert(Message)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["message_id"])
+        )
+
+    return len(rows)
+
+
+# In-process registry of import jobs; bounded so abandoned entries don't
+# accumulate across a long-running server
+_import_jobs: dict = {}
+_IMPORT_JOBS_MAX = 50
+
+
+def _record_job(job_id: str, **fields):
+    _import_jobs.setdefault(job_id, {"job_id": job_id}).update(fields)
+    while len(_import_jobs) > _IMPORT_JOBS_MAX:
+        _import_jobs.pop(next(iter(_import_jobs)))
+
+
+def _load_import_state() -> tuple:
+    """Worker-thread phase: read the account's import watermark"""
+    with models.SessionLocal() as db:
+        state = db.query(EmailImportState).filter(
+            EmailImportState.account == EMAIL_USER
+        ).first()
+        return (
+            state.last_uidvalidity if state else 0,
+            state.last_uid if state else 0,
+        )
+
+
+def _store_import_results(emails: List[dict], uidvalidity: int, new_last_uid: int) -> int:
+    """Worker-thread phase: insert messages and advance the watermark.
+
+    Watermark and inserts commit together so a crash between them can't
+    skip mail; the message_id unique index stays as backstop.
+    """
+    with models.SessionLocal() as db:
+        imported = _store_emails(db, emails)
+        state = db.query(EmailImportState).filter(
+            EmailImportState.account == EMAIL_USER
+        ).first()
+        if state is None:
+            state = EmailImportState(account=EMAIL_USER)
+            db.add(state)
+        state.last_uidvalidity = uidvalidity
+        state.last_uid = new_last_uid
+        db.commit()
+    return imported
+
+
+async def _run_import_job(job_id: str):
+    """Fetch and store new emails, tracking progress in the registry.
+
+    The DB phases run in worker threads: the dedup prefetch and bulk
+    INSERT in _store_emails can take seconds on a big import and must
+    not block the event loop.
+    """
+    _record_job(job_id, status="running")
+    try:
+        last_uidvalidity, last_uid = await asyncio.to_thread(_load_import_state)
+
+        emails, uidvalidity, new_last_uid = await _fetch_unseen_emails(
+            last_uidvalidity, last_uid
+        )
+
+        imported = await asyncio.to_thread(
+            _store_import_results, emails, uidvalidity, new_last_uid
+        )
+        _record_job(job_id, status="done", fetched=len(emails), imported=imported)
+    except Exception as e:
+        _record_job(job_id, status="failed", error=str(e))
+
+
+@router.post("/import-emails")
+async def import_emails():
+    """Queue an import of unseen emails from the configured IMAP inbox.
+
+    The fetch can take minutes on a large mailbox, so it runs as a
+    background task; poll /import-jobs/{job_id} for progress instead of
+    holding the HTTP request open.
+    """
+    if not EMAIL_HOST or not EMAIL_USER:
+        raise HTTPException(status_code=400, detail="Email import is not configured")
+
+    job_id = uuid.uuid4().hex
+    _record_job(job_id, status="queued")
+    asyncio.get_event_loop().create_task(_run_import_job(job_id))
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/import-jobs/{job_id}")
+def get_import_job(job_id: str):
+    """Get the status of an email import job"""
+    job = _import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
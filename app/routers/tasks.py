@@ -1,13 +1,24 @@
 """
 Tasks API Router
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import bindparam, case, func, or_, select, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+from functools import lru_cache
 import asyncio
+import time
 
-from app.models import Task, TaskLog, get_db
+# Rust-backed croniter is a drop-in ~20x faster at parse/get_next;
+# imported once here rather than per-request inside the handler
+try:
+    from croniter_rs import croniter
+except ImportError:
+    from croniter import croniter
+
+from app.models import Task, TaskLog, TaskStatsMV, get_db, get_db_ro
 from app.models.schemas import (
     TaskCreate, TaskUpdate, TaskResponse, TaskLogResponse,
     DashboardStats, CronValidateRequest, CronValidateResponse
@@ -17,6 +28,36 @@ from app.services.executor import TaskExecutor
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+# Compiled once at import; FastAPI's response_model path re-resolves the
+# list validator per response, these serialize straight to bytes
+_TASK_LIST_ADAPTER = TypeAdapter(List[TaskResponse])
+_TASKLOG_LIST_ADAPTER = TypeAdapter(List[TaskLogResponse])
+
+# Exactly the columns each response model exposes, so list queries skip
+# ORM instance hydration and fetch plain rows
+_TASK_COLS = [getattr(Task, name) for name in TaskResponse.model_fields]
+_TASKLOG_COLS = [getattr(TaskLog, name) for name in TaskLogResponse.model_fields]
+
+# Fixed-shape statements built once; together with the engine's query
+# cache the compile step stays off the per-request path
+_RECENT_LOGS_STMT = (
+    select(*_TASKLOG_COLS)
+    .order_by(TaskLog.started_at.desc(), TaskLog.id.desc())
+    .limit(bindparam("limit"))
+)
+_TASK_LOGS_STMT = (
+    select(*_TASKLOG_COLS)
+    .where(TaskLog.task_id == bindparam("task_id"))
+    .order_by(TaskLog.started_at.desc(), TaskLog.id.desc())
+    .limit(bindparam("limit"))
+)
+
+def _json_list_response(adapter: TypeAdapter, model_cls, rows) -> Response:
+    # model_construct skips validation: these rows come straight from
+    # our own schema, not from user input
+    models = [model_cls.model_construct(**row._mapping) for row in rows]
+    return Response(adapter.dump_json(models, warnings=False), media_type="application/json")
+
 # Global scheduler service (initialized in main.py)
 scheduler_service: TaskSchedulerService = None
 
@@ -31,29 +72,64 @@ async def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
-    
-    # Add to scheduler
-    await scheduler_service.add_task(db_task)
-    
+
+    # Queue the scheduler change; the outbox worker applies it
+    scheduler_service.enqueue("add", db_task.id)
+
     return db_task
 
-@router.get("/", response_model=List[TaskResponse])
+@router.post("/bulk")
+async def create_tasks_bulk(tasks: List[TaskCreate], db: Session = Depends(get_db)):
+    """Create many tasks in one request.
+
+    One add_all + one commit instead of a request (and transaction) per
+    task; scheduler changes go through the outbox as usual.
+    """
+    db_tasks = [Task(**t.model_dump()) for t in tasks]
+    db.add_all(db_tasks)
+    db.commit()
+
+    for db_task in db_tasks:
+        scheduler_service.enqueue("add", db_task.id)
+
+    return {"created": len(db_tasks), "ids": [t.id for t in db_tasks]}
+
+@router.get("/", response_model=None)
 def list_tasks(
-    skip: int = 0, 
-    limit: int = 100, 
+    skip: int = 0,
+    limit: int = 100,
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    is_active: Optional[bool] = None,
+    q: Optional[str] = None,
+    cursor: Optional[int] = None,
+    db: Session = Depends(get_db_ro)
 ):
-    """List all tasks"""
-    query = db.query(Task)
+    """List tasks, newest first.
+
+    Prefer cursor pagination (id of the last seen row) over skip:
+    OFFSET scans and discards skip rows, the cursor seeks straight to
+    the page. `q` matches name/description so search paginates
+    server-side instead of the client downloading everything.
+    """
+    stmt = select(*_TASK_COLS)
     if active_only:
-        query = query.filter(Task.is_enabled == True)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(Task.is_active == True)
+    if is_active is not None:
+        stmt = stmt.where(Task.is_active == is_active)
+    if q:
+        like = f"%{q}%"
+        stmt = stmt.where(or_(Task.name.ilike(like), Task.description.ilike(like)))
+    if cursor is not None:
+        stmt = stmt.where(Task.id < cursor)
+    elif skip:
+        stmt = stmt.offset(skip)
+    rows = db.execute(stmt.order_by(Task.id.desc()).limit(limit)).all()
+    return _json_list_response(_TASK_LIST_ADAPTER, TaskResponse, rows)
 
 @router.get("/{task_id}", response_model=TaskResponse)
-def get_task(task_id: int, db: Session = Depends(get_db)):
+def get_task(task_id: int, db: Session = Depends(get_db_ro)):
     """Get a specific task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
@@ -61,37 +137,36 @@ def get_task(task_id: int, db: Session = Depends(get_db)):
 @router.put("/{task_id}", response_model=TaskResponse)
 async def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get_db)):
     """Update a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Update fields
+    # updated_at is assigned server-side by the column's onupdate default
     for field, value in task_update.model_dump(exclude_unset=True).items():
         setattr(task, field, value)
-    
-    task.updated_at = datetime.utcnow()
+
     db.commit()
     db.refresh(task)
-    
-    # Update scheduler
-    await scheduler_service.update_task(task)
-    
+
+    # Queue the scheduler change; the outbox worker applies it
+    scheduler_service.enqueue("update", task.id)
+
     return task
 
 @router.delete("/{task_id}")
 async def delete_task(task_id: int, db: Session = Depends(get_db)):
     """Delete a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Remove from scheduler
-    await scheduler_service.remove_task(task_id)
-    
-    # Delete logs
-    db.query(TaskLog).filter(TaskLog.task_id == task_id).delete()
-    
-    # Delete task
+    # Queue the scheduler removal; the outbox worker applies it
+    scheduler_service.enqueue("remove", task_id)
+
+    # Logs go with the task via ON DELETE CASCADE (foreign_keys pragma is
+    # on), so this is one server-side statement with no Python-side
+    # tracking of log rows
     db.delete(task)
     db.commit()
     
@@ -100,10 +175,184 @@ async def delete_task(task_id: int, db: Session = Depends(get_db)):
 @router.post("/{task_id}/run")
 async def run_task_now(task_id: int, db: Session = Depends(get_db)):
     """Manually trigger a task"""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
+
+    # Release the session's write connection before the run: the pool
+    # holds a single connection and _begin_run_db needs it from a worker
+    # thread, so keeping it here would deadlock until the pool timeout
+    db.close()
+
     try:
         log = await scheduler_service.run_task_now(task_id, trigger_type="manual")
         return {"message": "Task executed", "log_id": log.id if log else None}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Task execution failed: {e}")
+
+@router.post("/{task_id}/toggle")
+async def toggle_task(task_id: int, db: Session = Depends(get_db)):
+    """Flip a task's active flag.
+
+    One UPDATE ... RETURNING instead of SELECT + mutate + UPDATE; the
+    row is only hydrated afterwards if the scheduler needs it.
+    """
+    task = db.execute(
+        update(Task)
+        .where(Task.id == task_id)
+        .values(is_active=~Task.is_active)
+        .returning(Task)
+    ).scalar_one_or_none()
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    is_active = bool(task.is_active)
+    db.commit()
+
+    # Rapid toggles coalesce in the outbox to the final state
+    scheduler_service.enqueue("add" if is_active else "remove", task_id)
+
+    return {"id": task_id, "is_active": is_active}
+
+def _parse_log_cursor(cursor: str):
+    """Parse a "<started_at_iso>|<id>" log cursor"""
+    try:
+        ts_str, _, id_str = cursor.partition("|")
+        return (datetime.fromisoformat(ts_str), int(id_str))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/logs/recent", response_model=None)
+def get_recent_logs(
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db_ro)
+):
+    """Recent task logs, newest first.
+
+    cursor is the "<started_at_iso>|<id>" of the last seen row and
+    keeps deep pages O(limit); offset stays supported for the UI.
+    """
+    if not status and not cursor and not offset:
+        rows = db.execute(_RECENT_LOGS_STMT, {"limit": limit}).all()
+        return _json_list_response(_TASKLOG_LIST_ADAPTER, TaskLogResponse, rows)
+
+    stmt = select(*_TASKLOG_COLS)
+    if status:
+        stmt = stmt.where(TaskLog.status == status)
+    if cursor:
+        stmt = stmt.where(tuple_(TaskLog.started_at, TaskLog.id) < _parse_log_cursor(cursor))
+    elif offset:
+        stmt = stmt.offset(offset)
+    rows = db.execute(
+        stmt.order_by(TaskLog.started_at.desc(), TaskLog.id.desc()).limit(limit)
+    ).all()
+    return _json_list_response(_TASKLOG_LIST_ADAPTER, TaskLogResponse, rows)
+
+@router.get("/{task_id}/logs", response_model=None)
+def get_task_logs(
+    task_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_ro)
+):
+    """Logs for one task, newest first, with keyset pagination"""
+    if not cursor:
+        rows = db.execute(_TASK_LOGS_STMT, {"task_id": task_id, "limit": limit}).all()
+        return _json_list_response(_TASKLOG_LIST_ADAPTER, TaskLogResponse, rows)
+
+    stmt = (
+        select(*_TASKLOG_COLS)
+        .where(TaskLog.task_id == task_id)
+        .where(tuple_(TaskLog.started_at, TaskLog.id) < _parse_log_cursor(cursor))
+    )
+    rows = db.execute(
+        stmt.order_by(TaskLog.started_at.desc(), TaskLog.id.desc()).limit(limit)
+    ).all()
+    return _json_list_response(_TASKLOG_LIST_ADAPTER, TaskLogResponse, rows)
+
+@router.get("/stats/dashboard", response_model=DashboardStats)
+def get_dashboard_stats(request: Request, response: Response, db: Session = Depends(get_db_ro)):
+    """Dashboard summary.
+
+    Counters come from the scheduler-maintained task_stats_mv row — a
+    single indexed fetch — instead of re-aggregating tasks/task_logs on
+    every request. Only the two small ORDER BY ... LIMIT lists hit the
+    base tables. Polling clients get a strong ETag derived from the
+    counters and newest log timestamp; unchanged data answers 304
+    without touching the serialization path.
+    """
+    row = db.query(TaskStatsMV).filter(TaskStatsMV.id == 1).first()
+
+    latest_log_at = db.query(func.max(TaskLog.started_at)).scalar()
+    if row is not None:
+        etag = f'"{row.updated_at}-{row.total_runs}-{row.running_tasks}-{latest_log_at}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    if row is not None:
+        total_tasks = row.total_tasks
+        active_tasks = row.active_tasks
+        running_tasks = row.running_tasks
+        total_runs = row.total_runs
+        success_runs = row.success_runs
+    else:
+        # Fresh database: the scheduler has not materialized the row yet.
+        # Conditional aggregation scans each table once instead of
+        # paying a round-trip per counter.
+        total_tasks, active_tasks, running_tasks = db.query(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.is_active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Task.is_running == True, 1), else_=0)), 0),
+        ).one()
+        total_runs, success_runs = db.query(
+            func.count(TaskLog.id),
+            func.coalesce(func.sum(case((TaskLog.status == "success", 1), else_=0)), 0),
+        ).one()
+
+    success_rate = round(success_runs / total_runs * 100, 2) if total_runs else 0.0
+
+    recent_logs = db.query(TaskLog).order_by(TaskLog.started_at.desc()).limit(10).all()
+    upcoming_tasks = (
+        db.query(Task)
+        .filter(Task.is_active == True, Task.next_run_at.isnot(None))
+        .order_by(Task.next_run_at)
+        .limit(5)
+        .all()
+    )
+
+    return DashboardStats(
+        total_tasks=total_tasks,
+        active_tasks=active_tasks,
+        running_tasks=running_tasks,
+        total_runs=total_runs,
+        success_rate=success_rate,
+        recent_logs=recent_logs,
+        upcoming_tasks=upcoming_tasks,
+    )
+
+@lru_cache(maxsize=1024)
+def _compute_next_runs(expression: str, bucket: int) -> tuple:
+    """Next five run times for a cron expression.
+
+    Pure function of (expression, minute bucket): validating the same
+    expression within the same minute is a dict hit instead of cron
+    iteration. Raises on an invalid expression.
+    """
+    itr = croniter(expression, datetime.utcnow())
+    return tuple(
+        itr.get_next(datetime).strftime("%Y-%m-%d %H:%M:%S")
+        for _ in range(5)
+    )
+
+@router.post("/validate-cron", response_model=CronValidateResponse)
+def validate_cron(request: CronValidateRequest):
+    """Validate a cron expression and preview the next five run times"""
+    try:
+        next_runs = _compute_next_runs(request.expression, int(time.time() // 60))
+        return CronValidateResponse(valid=True, next_runs=list(next_runs))
+    except Exception as e:
+        return CronValidateResponse(valid=False, next_runs=[], error=str(e))
@@ -5,165 +5,406 @@ Check email inbox and create tasks from new emails
 import os
 import sys
 import json
+import codecs
+import base64
 import imaplib
 import email
-from email.header import decode_header
+import email.policy
+import quopri
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.utils import parseaddr
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from datetime import datetime
 
-# Email configuration
-EMAIL_HOST = 'imap.exmail.qq.com'
-EMAIL_PORT = 993
-EMAIL_USER = 'hr@weilan.com'
-EMAIL_PASS = '9wpCjNNcMvj845Fv'
-TASKFLOW_API = 'http://localhost:8000/api'
+# Parallel task-creation POSTs; wall time becomes ~N/POST_WORKERS
+# round-trips instead of one per email
+POST_WORKERS = 10
+
+# Header-only parser, reused across messages
+_HEADER_PARSER = BytesHeaderParser()
+
+# How long a single IDLE may sit before being re-issued (servers
+# commonly drop IDLE connections at 30 minutes)
+IDLE_TIMEOUT = 1740
+
+class AIMDController:
+    """Additive-increase/multiplicative-decrease POST concurrency.
+
+    Successful fast responses nudge the allowed concurrency up by
+    0.5; a 429/5xx or a response slower than the latency target
+    halves it. The pool threads block here instead of hammering an
+    overloaded API.
+    """
+
+    def __init__(self, max_limit, target_latency=0.5):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.inflight = 0
+        self.target_latency = target_latency
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.inflight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.inflight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify_all()
+
+    def observe(self, status_code, elapsed):
+        with self._cond:
+            if status_code == 429 or status_code >= 500 or elapsed > self.target_latency:
+                self.limit = max(1.0, self.limit * 0.5)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 0.5)
+            self._cond.notify_all()
+
+_post_controller = AIMDController(POST_WORKERS)
+
+# One Session shared by the POST workers: keepalive avoids a TCP
+# handshake per email, and the pool is sized to match the workers
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=POST_WORKERS,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+))
+
+# Email configuration comes from the environment so credentials never
+# live in the repo and parallel workers can target different mailboxes
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'imap.exmail.qq.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '993'))
+EMAIL_USER = os.environ.get('EMAIL_USER')
+EMAIL_PASS = os.environ.get('EMAIL_PASS')
+TASKFLOW_API = os.getenv('TASKFLOW_API', 'http://localhost:8000/api')
+
+# charset-normalizer ships with requests; one statistical pass beats
+# raising/catching UnicodeDecodeError up to four times per blob
+try:
+    from charset_normalizer import from_bytes as _detect_charset
+except ImportError:
+    _detect_charset = None
+    _DECODERS = [codecs.lookup(name).decode for name in ('utf-8', 'gbk', 'gb2312', 'big5', 'latin-1')]
 
 def decode_str(s):
-    """Decode string with multiple encoding attempts"""
+    """Decode bytes via single-pass charset detection"""
     if isinstance(s, str):
         return s
-    for encoding in ['utf-8', 'gbk', 'gb2312', 'big5', 'latin-1']:
-        try:
-            return s.decode(encoding)
-        except:
-            continue
+    if not s:
+        return ''
+    # utf-8 fast path: the overwhelmingly common case, and cheaper
+    # than statistical detection when it succeeds
+    try:
+        return s.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    if _detect_charset is not None:
+        best = _detect_charset(s).best()
+        if best is not None:
+            return str(best)
+    else:
+        for decode in _DECODERS[1:]:
+            try:
+                return decode(s)[0]
+            except (UnicodeDecodeError, ValueError):
+                continue
     return s.decode('utf-8', errors='ignore')
 
+def decode_bytes_with_charset(payload, charset):
+    """Decode payload with its declared charset, else detect"""
+    if not payload:
+        return ''
+    if charset:
+        try:
+            return payload.decode(charset)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return decode_str(payload)
+
+# Only body[:500] is ever consumed; cap at the byte level before any
+# charset decode so oversized parts don't get decoded just to be sliced
+BODY_BYTE_CAP = 2048
+
 def get_email_body(msg):
     """Extract email body with encoding handling"""
-    body = ""
     if msg.is_multipart():
+        # Fast path: multipart/alternative almost always leads with the
+        # text/plain subpart, so skip the full-tree walk when it does
+        first = msg.get_payload(0)
+        if first.get_content_type() == "text/plain":
+            return decode_bytes_with_charset(
+                (first.get_payload(decode=True) or b'')[:BODY_BYTE_CAP],
+                first.get_content_charset()
+            )
         for part in msg.walk():
-            content_type = part.get_content_type()
-            if content_type == "text/plain":
-                payload = part.get_payload(decode=True)
-                if payload:
-                    charset = part.get_content_charset()
-                    try:
-                        if charset:
-                            body = payload.decode(charset)
-                        else:
-                            body = decode_str(payload)
-                    except:
-                        body = decode_str(payload)
-                break
-    else:
-        payload = msg.get_payload(decode=True)
-        if payload:
-            charset = msg.get_content_charset()
-            try:
-                if charset:
-                    body = payload.decode(charset)
-                else:
-                    body = decode_str(payload)
-            except:
-                body = decode_str(payload)
-    return body
+            if part.get_content_type() == "text/plain":
+                return decode_bytes_with_charset(
+                    (part.get_payload(decode=True) or b'')[:BODY_BYTE_CAP],
+                    part.get_content_charset()
+                )
+        return ""
+    return decode_bytes_with_charset(
+        (msg.get_payload(decode=True) or b'')[:BODY_BYTE_CAP],
+        msg.get_content_charset()
+    )
+
+def _decode_header_value(value):
+    """Decode an RFC2047 header to a plain string.
+
+    Stuffed headers are truncated before decoding; downstream only
+    keeps short prefixes anyway.
+    """
+    value = (value or '')[:BODY_BYTE_CAP]
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return decode_str(value)
+
+def _decode_body_part(mime_blob, payload):
+    """Decode a raw MIME part using its own headers.
+
+    mime_blob is the part's MIME header (BODY[n.MIME]); it carries the
+    Content-Transfer-Encoding and charset needed to decode payload.
+    Non-text parts are skipped.
+    """
+    if not payload:
+        return ''
+    part = _HEADER_PARSER.parsebytes(mime_blob or b'')
+    if part.get_content_maintype() not in ('text', ''):
+        return ''
+    cte = (part.get('Content-Transfer-Encoding') or '').lower()
+    if cte == 'base64':
+        try:
+            # Partial fetches can cut mid-quantum; trim to a multiple
+            # of 4 so the truncation point doesn't poison the decode
+            compact = b''.join(payload.split())
+            payload = base64.b64decode(compact[:len(compact) - len(compact) % 4])
+        except Exception:
+            pass
+    elif cte == 'quoted-printable':
+        payload = quopri.decodestring(payload)
+    return decode_bytes_with_charset(payload, part.get_content_charset())
+
+def _fetch_and_parse(mail, email_ids):
+    """Fetch and parse (email_id, subject, from_addr, body) tuples.
+
+    Fetches only the header and the first MIME part instead of the
+    full RFC822 blob, so attachments are never downloaded or parsed.
+    Falls back to a full fetch if the server's sectioned response
+    doesn't line up.
+    """
+    id_set = b','.join(email_ids)
+    # <0.2048> caps the body bytes per message; the task description
+    # only keeps 500 chars, so the rest would be thrown away anyway
+    status, msg_data = mail.fetch(
+        id_set, '(BODY.PEEK[HEADER] BODY.PEEK[1.MIME] BODY.PEEK[1]<0.2048>)'
+    )
+    if status == 'OK':
+        blobs = [part[1] for part in msg_data if isinstance(part, tuple)]
+        if len(blobs) == 3 * len(email_ids):
+            emails = []
+            for email_id, header, part_mime, part_body in zip(
+                email_ids, blobs[0::3], blobs[1::3], blobs[2::3]
+            ):
+                msg = _HEADER_PARSER.parsebytes(header)
+                emails.append((
+                    email_id,
+                    _decode_header_value(msg['Subject']),
+                    _decode_header_value(msg['From']),
+                    _decode_body_part(part_mime, part_body),
+                ))
+            return emails
+
+    # Sectioned fetch failed or returned an unexpected shape; fall
+    # back to full messages. policy.default gives decoded headers and
+    # get_body picks the plain part without a manual MIME walk
+    status, msg_data = mail.fetch(id_set, '(BODY.PEEK[])')
+    if status != 'OK':
+        return None
+    raw_emails = [part[1] for part in msg_data if isinstance(part, tuple)]
+    emails = []
+    for email_id, raw_email in zip(email_ids, raw_emails):
+        msg = email.message_from_bytes(raw_email, policy=email.policy.default)
+        try:
+            body_part = msg.get_body(preferencelist=('plain',))
+            body = body_part.get_content()[:BODY_BYTE_CAP] if body_part else ''
+        except (KeyError, LookupError):
+            body = get_email_body(msg)
+        emails.append((
+            email_id,
+            str(msg['Subject'] or '')[:BODY_BYTE_CAP],
+            str(msg['From'] or '')[:BODY_BYTE_CAP],
+            body,
+        ))
+    return emails
+
+def _process_email(item):
+    """POST a task for one parsed email.
+
+    Returns the IMAP id on success so the caller can flag it Seen.
+    """
+    email_id, subject, from_addr, body = item
+    sender_name, sender_email = parseaddr(from_addr)
+
+    print(f"Processing email: {subject[:100]}")
+
+    # Create task from email
+    task_data = {
+        "name": f"邮件任务: {subject[:50]}",
+        "description": f"From: {from_addr}\n\n{body[:500]}",
+        "task_type": "shell",
+        "cron_expression": "0 0 * * *",
+        "config": {
+            "command": f"echo 'Processing email: {subject[:100]}'",
+            "timeout": 300
+        },
+        "is_enabled": True
+    }
+
+    # Send to TaskFlow API
+    try:
+        start = time.monotonic()
+        with _post_controller:
+            response = _session.post(
+                f"{TASKFLOW_API}/tasks/",
+                json=task_data,
+                timeout=10
+            )
+        _post_controller.observe(response.status_code, time.monotonic() - start)
+        if response.status_code == 200:
+            print(f"Created task for: {subject[:50]}")
+            return email_id
+        print(f"Failed to create task: {response.text}")
+    except Exception as e:
+        # Connection-level failures back off like a 5xx would
+        _post_controller.observe(599, 0.0)
+        print(f"Error creating task: {e}")
+    return None
+
+def _connect():
+    """Log in and select the inbox"""
+    mail = imaplib.IMAP4_SSL(EMAIL_HOST, EMAIL_PORT)
+    mail.login(EMAIL_USER, EMAIL_PASS)
+    mail.select('inbox')
+    return mail
+
+def _process_inbox(mail):
+    """Process all unseen messages on an open connection"""
+    status, messages = mail.search(None, 'UNSEEN')
+    if status != 'OK':
+        print("No new messages")
+        return 0
+
+    email_ids = messages[0].split()
+    print(f"Found {len(email_ids)} new emails")
+    if not email_ids:
+        return 0
+
+    # One batched FETCH for all messages instead of a round-trip
+    # each; BODY.PEEK avoids the implicit \Seen so flags are set
+    # explicitly (and only) for messages we actually handled
+    emails = _fetch_and_parse(mail, email_ids)
+    if emails is None:
+        print("Failed to fetch messages")
+        return 0
+
+    # Parsing is cheap; the POSTs dominate wall time, so fan them
+    # out over a small thread pool and overlap the HTTP latency
+    with ThreadPoolExecutor(max_workers=POST_WORKERS) as pool:
+        results = pool.map(_process_email, emails)
+    processed_ids = [email_id for email_id in results if email_id is not None]
+
+    # One batched flag update for everything that succeeded
+    if processed_ids:
+        mail.store(b','.join(processed_ids), '+FLAGS', '\\Seen')
+    return len(processed_ids)
+
+def _idle_wait(mail, timeout=IDLE_TIMEOUT):
+    """Block on IMAP IDLE until the server pushes an update or timeout.
+
+    imaplib has no IDLE support, so the command goes over the wire
+    raw. Returns True when an untagged EXISTS/RECENT arrived.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    if not mail.readline().startswith(b'+'):
+        raise mail.error("server refused IDLE")
+    updated = False
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        ready, _, _ = select.select([mail.socket()], [], [], remaining)
+        if not ready:
+            break
+        line = mail.readline()
+        if not line:
+            break
+        if b'EXISTS' in line or b'RECENT' in line:
+            updated = True
+            break
+    mail.send(b'DONE\r\n')
+    while not mail.readline().startswith(tag):
+        pass
+    return updated
 
 def check_emails():
     """Check inbox for new emails and create tasks"""
+    if not EMAIL_USER or not EMAIL_PASS:
+        print("EMAIL_USER and EMAIL_PASS must be set in the environment")
+        return 1
     try:
-        # Connect to IMAP server
-        mail = imaplib.IMAP4_SSL(EMAIL_HOST, EMAIL_PORT)
-        mail.login(EMAIL_USER, EMAIL_PASS)
-        mail.select('inbox')
-        
-        # Search for unread emails
-        status, messages = mail.search(None, 'UNSEEN')
-        
-        if status != 'OK':
-            print("No new messages")
-            return 0
-        
-        email_ids = messages[0].split()
-        print(f"Found {len(email_ids)} new emails")
-        
-        for email_id in email_ids:
-            # Fetch email
-            status, msg_data = mail.fetch(email_id, '(RFC822)')
-            if status != 'OK':
-                continue
-            
-            raw_email = msg_data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            
-            # Parse email subject
-            subject_header = msg['Subject']
-            subject = ""
-            if subject_header:
-                decoded_header = decode_header(subject_header)
-                for part, charset in decoded_header:
-                    if isinstance(part, bytes):
-                        try:
-                            if charset:
-                                subject += part.decode(charset)
-                            else:
-                                subject += decode_str(part)
-                        except:
-                            subject += decode_str(part)
-                    else:
-                        subject += part
-            
-            # Parse from address
-            from_header = msg['From']
-            from_addr = ""
-            if from_header:
-                decoded_from = decode_header(from_header)
-                for part, charset in decoded_from:
-                    if isinstance(part, bytes):
-                        try:
-                            if charset:
-                                from_addr += part.decode(charset)
-                            else:
-                                from_addr += decode_str(part)
-                        except:
-                            from_addr += decode_str(part)
-                    else:
-                        from_addr += part
-            
-            # Get email body
-            body = get_email_body(msg)
-            
-            print(f"Processing email: {subject[:100]}")
-            
-            # Create task from email
-            task_data = {
-                "name": f"邮件任务: {subject[:50]}",
-                "description": f"From: {from_addr}\n\n{body[:500]}",
-                "task_type": "shell",
-                "cron_expression": "0 0 * * *",
-                "config": {
-                    "command": f"echo 'Processing email: {subject[:100]}'",
-                    "timeout": 300
-                },
-                "is_enabled": True
-            }
-            
-            # Send to TaskFlow API
-            try:
-                response = requests.post(
-                    f"{TASKFLOW_API}/tasks/",
-                    json=task_data,
-                    timeout=10
-                )
-                if response.status_code == 200:
-                    print(f"Created task for: {subject[:50]}")
-                    mail.store(email_id, '+FLAGS', '\\Seen')
-                else:
-                    print(f"Failed to create task: {response.text}")
-            except Exception as e:
-                print(f"Error creating task: {e}")
-        
+        mail = _connect()
+        _process_inbox(mail)
         mail.close()
         mail.logout()
         print("Email check completed")
         return 0
-        
+
     except Exception as e:
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
         return 1
 
+def watch_emails():
+    """Daemon mode: one persistent connection plus IMAP IDLE.
+
+    Avoids the TLS+LOGIN cost every cron invocation pays and picks up
+    new mail on server push instead of a polling interval. Reconnects
+    with backoff on any connection error.
+    """
+    if not EMAIL_USER or not EMAIL_PASS:
+        print("EMAIL_USER and EMAIL_PASS must be set in the environment")
+        return 1
+    backoff = 5
+    while True:
+        try:
+            mail = _connect()
+            backoff = 5
+            _process_inbox(mail)
+            while True:
+                # Re-issue IDLE before the common 29-minute server cap;
+                # a timeout doubles as a periodic safety sweep
+                _idle_wait(mail)
+                _process_inbox(mail)
+        except KeyboardInterrupt:
+            return 0
+        except Exception as e:
+            print(f"Connection lost ({e}); reconnecting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 300)
+
 if __name__ == '__main__':
-    sys.exit(check_emails())
+    sys.exit(watch_emails() if '--watch' in sys.argv else check_emails())
@@ -0,0 +1,3 @@
+"""
+Service layer: scheduler, executor, and AI services
+"""
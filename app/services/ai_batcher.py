@@ -0,0 +1,83 @@
+"""
+AI request micro-batcher - coalesces AI endpoint calls arriving within a
+short window and dispatches them to the LLM backend together, so
+concurrent requests amortize per-call overhead instead of hitting
+Ollama one prompt at a time.
+"""
+import asyncio
+from loguru import logger
+
+MAX_BATCH = 8
+BATCH_WINDOW_MS = 20
+
+
+class AIBatcher:
+    def __init__(self, ai_service_factory, batch_size=MAX_BATCH, max_wait_ms=BATCH_WINDOW_MS):
+        self._ai_service_factory = ai_service_factory
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def start(self):
+        """Start the background batch worker (call from lifespan)"""
+        self._worker = asyncio.get_event_loop().create_task(self._run())
+        logger.info("AI batcher started")
+
+    def stop(self):
+        """Stop the batch worker"""
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+
+    async def submit(self, kind: str, payload):
+        """Queue a request and wait for its result.
+
+        kind is one of: natural_to_cron, generate_name, suggest_config, chat.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((kind, payload, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+
+            # Collect whatever else arrives inside the batch window
+            deadline = loop.time() + self.max_wait_ms / 1000.0
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            service = self._ai_service_factory()
+            results = await asyncio.gather(
+                *[self._dispatch(service, kind, payload) for kind, payload, _ in batch],
+                return_exceptions=True
+            )
+            for (_, _, future), result in zip(batch, results):
+                if future.cancelled():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _dispatch(self, service, kind: str, payload):
+        if kind == "natural_to_cron":
+            return await service.natural_language_to_cron_async(payload)
+        if kind == "generate_name":
+            return await service.generate_task_name_async(payload)
+        if kind == "suggest_config":
+            return await service.suggest_task_config_async(payload)
+        if kind == "chat":
+            return await asyncio.to_thread(
+                service.chat_assistant, payload["message"], payload.get("context")
+            )
+        raise ValueError(f"Unknown batch kind: {kind}")
@@ -6,11 +6,115 @@ os.environ['NO_PROXY'] = 'localhost,127.0.0.1'
 os.environ['HTTP_PROXY'] = ''
 os.environ['HTTPS_PROXY'] = ''
 
+import asyncio
 import re
+import threading
+import time
+
+import orjson
+import requests
+from collections import OrderedDict, deque
+from functools import lru_cache
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 import json
 
+from croniter import croniter
+
+try:
+    import ollama
+except ImportError:
+    ollama = None
+
+
+@lru_cache(maxsize=256)
+def _next_runs_cached(cron: str, count: int, minute_bucket: int) -> tuple:
+    """Next run times for a cron, cached per wall-clock minute.
+
+    The UI polls the same expressions repeatedly; keying on the current
+    minute keeps repeat lookups free while the answer cannot change.
+    """
+    itr = croniter(cron, datetime.now())
+    return tuple(itr.get_next(datetime).strftime("%Y-%m-%d %H:%M") for _ in range(count))
+
+# Compiled once at import; these run on every parse/analyze call
+_MINUTE_RE = re.compile(r'每(\d+)分钟')
+_HOUR_RE = re.compile(r'每(\d+)小时')
+_DAILY_RE = re.compile(r'每天.*?(\d+)[点:：]')
+_TIME_RE = re.compile(r'(\d+)[点:：]')
+
+# One compiled scan per task type instead of chained substring tests;
+# the matched group index picks the (category, suggestions) pair
+_ERROR_RULES = {
+    "http": (re.compile(r'(timeout)|(404)|(401|403)'), (
+        ("timeout", ["增加超时时间", "检查服务器状态"]),
+        ("not_found", ["检查URL路径"]),
+        ("auth", ["检查认证信息"]),
+    )),
+    "shell": (re.compile(r'(command not found)|(permission denied)'), (
+        ("command_not_found", ["检查命令是否安装"]),
+        ("permission", ["检查文件权限"]),
+    )),
+    "python": (re.compile(r'(module not found)|(syntaxerror)'), (
+        ("import_error", ["安装缺失模块"]),
+        ("syntax_error", ["检查代码语法"]),
+    )),
+}
+
+@lru_cache(maxsize=1024)
+def _classify_error(error_message: str, task_type: str) -> Dict[str, Any]:
+    """Classify an error message by task-type rule table"""
+    suggestions = []
+    category = "unknown"
+
+    rule = _ERROR_RULES.get(task_type)
+    if rule:
+        pattern, outcomes = rule
+        match = pattern.search(error_message.lower())
+        if match:
+            category, suggestions = outcomes[match.lastindex - 1]
+
+    if not suggestions:
+        suggestions = ["查看完整日志", "检查配置", "手动测试"]
+
+    return {
+        "category": category,
+        "suggestions": suggestions,
+        "confidence": 0.6,
+        "source": "rule"
+    }
+
+# Same single-scan shape as _ERROR_RULES, for the chat fallback
+_CHAT_RE = re.compile(r'(创建|新建|添加)|(cron|定时|表达式)')
+_CHAT_OUTCOMES = (
+    {
+        "type": "create_task",
+        "response": "我来帮您创建任务。请描述：\n1. 任务要做什么？\n2. 什么时候执行？",
+        "action": "open_task_modal"
+    },
+    {
+        "type": "cron_help",
+        "response": "Cron 格式：分 时 日 月 周\n示例：0 9 * * *（每天9点）",
+        "action": "show_cron_helper"
+    },
+)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def _extract_json(s: str):
+    """Parse the first JSON object embedded in LLM output.
+
+    raw_decode parses in place from the first brace — single pass, no
+    DOTALL regex scan or substring copy.
+    """
+    i = s.find('{')
+    if i < 0:
+        return None
+    try:
+        return _JSON_DECODER.raw_decode(s, i)[0]
+    except ValueError:
+        return None
+
 class AIService:
     """AI-powered features using local Ollama models"""
     
@@ -20,6 +124,7 @@ class AIService:
         "qwen2.5:7b",
         "qwen:14b",
         "qwen:7b",
+        "llama3.2:3b-instruct-q4_K_M",
         "llama3.2",
         "llama3.1",
         "llama3",
@@ -30,10 +135,67 @@ class AIService:
         "phi3",
     ]
     
+    # Repeated identical prompts shouldn't pay a second LLM round-trip
+    CACHE_MAX_ENTRIES = 2048
+
+    # Passed with every Ollama call: our prompts are short, so a small
+    # context window leaves more VRAM for KV cache and batching
+    OLLAMA_OPTIONS = {"num_ctx": 2048, "num_batch": 512, "num_gpu": 999}
+
+    # The local model list changes rarely; share one ollama.list()
+    # result across instances for a minute instead of re-hitting the
+    # daemon on every construction
+    MODELS_CACHE_TTL = 60.0
+    _models_cache = {"ts": 0.0, "data": None}
+    _models_cache_lock = threading.Lock()
+
+    # Rule matches for the common Chinese schedule phrases, checked
+    # before any LLM round-trip
+    COMMON_PATTERNS = {
+        "每小时": "0 * * * *",
+        "每天": "0 0 * * *",
+        "每天早上9点": "0 9 * * *",
+        "每天早上8点": "0 8 * * *",
+        "每天晚上6点": "0 18 * * *",
+        "每天晚上8点": "0 20 * * *",
+        "每周一": "0 0 * * 1",
+        "每周日": "0 0 * * 0",
+        "每月1号": "0 0 1 * *",
+        "每5分钟": "*/5 * * * *",
+        "每10分钟": "*/10 * * * *",
+        "每30分钟": "*/30 * * * *",
+    }
+
+    # One alternation scan over the text instead of a substring check
+    # per pattern; alternative order preserves the dict's priority
+    _COMMON_PATTERN_RE = re.compile("|".join(re.escape(p) for p in COMMON_PATTERNS))
+
     def __init__(self, model_name: str = None):
         self.model = model_name
         self.ollama_available = False
         self.available_models = []
+        self._result_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._status_cache = None
+        # Match client-side parallelism to the Ollama server's slot count;
+        # calls are blocking so a threading semaphore bounds them
+        self.max_concurrency = int(os.getenv("AI_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+        self._llm_semaphore = threading.Semaphore(self.max_concurrency)
+        # Sliding-window rate limit: Ollama exposes no rate-limit
+        # headers, so cap calls per minute to keep its queue short
+        self.calls_per_minute = int(os.getenv("AI_CALLS_PER_MINUTE", "30"))
+        self._call_times = deque()
+        self._rate_lock = threading.Lock()
+        # Prefer an OpenAI-compatible endpoint (vLLM etc.) when one is
+        # configured — continuous batching there beats Ollama under
+        # concurrency; Ollama stays as the local fallback
+        self.openai_base_url = (os.getenv("VLLM_URL") or os.getenv("LLM_BASE_URL") or "").rstrip("/")
+        self._openai_session = requests.Session() if self.openai_base_url else None
+        if self._openai_session is not None and not self.model:
+            self.model = os.getenv("LLM_MODEL")
+        # One explicit client so every call reuses its keep-alive pool
+        # instead of the implicit per-call module client
+        self._ollama = ollama.Client(timeout=60) if ollama is not None else None
         self._check_ollama()
         
         if not self.model and self.ollama_available:
@@ -41,9 +203,24 @@ class AIService:
     
     def _check_ollama(self):
         """Check if Ollama is running and get available models"""
+        self._status_cache = None
+        if self._openai_session is not None:
+            # Remote OpenAI-compatible backend; no local model listing
+            self.ollama_available = True
+            return
+        if ollama is None:
+            self.ollama_available = False
+            self.available_models = []
+            return
         try:
-            import ollama
-            models_info = ollama.list()
+            with AIService._models_cache_lock:
+                cache = AIService._models_cache
+                if cache["data"] is not None and time.monotonic() - cache["ts"] < self.MODELS_CACHE_TTL:
+                    models_info = cache["data"]
+                else:
+                    models_info = self._ollama.list()
+                    cache["data"] = models_info
+                    cache["ts"] = time.monotonic()
             self.ollama_available = True
             
             # Extract model names from ollama list response
@@ -64,101 +241,208 @@ class AIService:
     def _select_best_model(self) -> str:
         """Select the best available model from preferred list"""
         if not self.available_models:
-            return "llama3.2"  # fallback default
-        
-        # Check for exact matches first
+            # Q4_K_M quant: ~4x smaller weights, markedly higher tokens/s
+            return "llama3.2:3b-instruct-q4_K_M"  # fallback default
+
+        # Hash lookups instead of nested substring scans: exact name
+        # first, then family match (e.g. "qwen2.5" for "qwen2.5:14b")
+        available_set = set(self.available_models)
         for preferred in self.PREFERRED_MODELS:
-            if preferred in self.available_models:
+            if preferred in available_set:
                 return preferred
-        
-        # Check for partial matches (e.g., "qwen2.5" matches "qwen2.5:14b")
+
+        available_by_family = {}
+        for name in self.available_models:
+            available_by_family.setdefault(name.split(':')[0], name)
         for preferred in self.PREFERRED_MODELS:
-            base_name = preferred.split(':')[0]
-            for available in self.available_models:
-                if base_name in available or available in preferred:
-                    return available
-        
+            match = available_by_family.get(preferred.split(':')[0])
+            if match is not None:
+                return match
+
         # Return first available model if no preferred match
-        return self.available_models[0] if self.available_models else "llama3.2"
+        return self.available_models[0]
     
+    def _cache_get(self, kind: str, text: str):
+        key = (kind, text.strip().lower())
+        with self._cache_lock:
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                return self._result_cache[key]
+        return None
+
+    def _cache_put(self, kind: str, text: str, value):
+        key = (kind, text.strip().lower())
+        with self._cache_lock:
+            self._result_cache[key] = value
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.CACHE_MAX_ENTRIES:
+                self._result_cache.popitem(last=False)
+
+    def _rate_limit(self):
+        """Block until a call slot is free in the sliding 60s window"""
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                while self._call_times and now - self._call_times[0] >= 60:
+                    self._call_times.popleft()
+                if len(self._call_times) < self.calls_per_minute:
+                    self._call_times.append(now)
+                    return
+                wait = self._call_times[0] + 60 - now
+            time.sleep(wait)
+
+    def _chat_completion(self, messages: List[Dict[str, str]], temperature: float = 0.3,
+                         num_predict: int = None) -> str:
+        """Route one chat call to the configured backend"""
+        if self._openai_session is not None:
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+                "stream": False
+            }
+            if num_predict is not None:
+                payload["max_tokens"] = num_predict
+            resp = self._openai_session.post(
+                f"{self.openai_base_url}/v1/chat/completions",
+                json=payload,
+                timeout=60
+            )
+            resp.raise_for_status()
+            return resp.json()["choices"][0]["message"]["content"]
+        options = {**self.OLLAMA_OPTIONS, "temperature": temperature}
+        if num_predict is not None:
+            options["num_predict"] = num_predict
+        response = self._ollama.chat(
+            model=self.model,
+            messages=messages,
+            options=options
+        )
+        return response['message']['content']
+
     def _call_llm(self, prompt: str, system_prompt: str = "") -> str:
         """Call local Ollama model"""
         if not self.ollama_available:
             return ""
-        
+
+        # Identical prompts shouldn't pay inference twice; share the
+        # bounded result cache, keyed on model + both prompt parts
+        cache_key = f"{self.model}\x00{system_prompt}\x00{prompt}"
+        cached = self._cache_get("llm", cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            import ollama
-            response = ollama.chat(
-                model=self.model,
-                messages=[
+            self._rate_limit()
+            with self._llm_semaphore:
+                content = self._chat_completion([
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
-                ],
-                options={"temperature": 0.3}
-            )
-            return response['message']['content']
+                ])
+            if content:
+                self._cache_put("llm", cache_key, content)
+            return content
         except Exception as e:
             print(f"LLM调用失败: {e}")
             return ""
     
+    def _call_llm_json(self, prompt: str, system_prompt: str = "",
+                       num_predict: int = 200) -> Optional[Dict[str, Any]]:
+        """Stream a completion and return its first JSON object.
+
+        Parsing is attempted as chunks arrive, so the call returns the
+        moment the closing brace lands instead of waiting out whatever
+        trailing prose the model generates. num_predict bounds the
+        generation — decode time scales with output tokens, so a tight
+        cap keeps worst-case latency down even when parsing fails.
+        """
+        if not self.ollama_available:
+            return None
+
+        cache_key = f"{self.model}\x00{system_prompt}\x00{prompt}"
+        cached = self._cache_get("llm_json", cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            self._rate_limit()
+            buf = ""
+            obj = None
+            with self._llm_semaphore:
+                if self._openai_session is not None:
+                    obj = _extract_json(self._chat_completion([
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ], num_predict=num_predict))
+                    if obj is not None:
+                        self._cache_put("llm_json", cache_key, obj)
+                    return obj
+                stream = self._ollama.chat(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    options={**self.OLLAMA_OPTIONS, "temperature": 0.3,
+                             "num_predict": num_predict},
+                    stream=True
+                )
+                for chunk in stream:
+                    buf += chunk['message']['content']
+                    obj = _extract_json(buf)
+                    if obj is not None:
+                        break
+            if obj is not None:
+                self._cache_put("llm_json", cache_key, obj)
+            return obj
+        except Exception as e:
+            print(f"LLM调用失败: {e}")
+            return None
+
     def natural_language_to_cron(self, text: str) -> Dict[str, Any]:
         """Convert natural language to cron using LLM + rules"""
         text = text.strip()
-        
-        # 先尝试规则匹配（快速）
-        common_patterns = {
-            "每小时": "0 * * * *",
-            "每天": "0 0 * * *",
-            "每天早上9点": "0 9 * * *",
-            "每天早上8点": "0 8 * * *",
-            "每天晚上6点": "0 18 * * *",
-            "每天晚上8点": "0 20 * * *",
-            "每周一": "0 0 * * 1",
-            "每周日": "0 0 * * 0",
-            "每月1号": "0 0 1 * *",
-            "每5分钟": "*/5 * * * *",
-            "每10分钟": "*/10 * * * *",
-            "每30分钟": "*/30 * * * *",
-        }
-        
-        for pattern, cron in common_patterns.items():
-            if pattern in text:
-                return {
-                    "success": True,
-                    "cron": cron,
-                    "description": f"匹配到模式: {pattern}",
-                    "next_runs": self._get_next_runs(cron),
-                    "source": "rule"
-                }
+
+        cached = self._cache_get("cron", text)
+        if cached is not None:
+            # The parse itself is cacheable; next_runs depend on wall
+            # clock, so refresh only those on a hit
+            if cached.get("cron"):
+                return {**cached, "next_runs": self._get_next_runs(cached["cron"])}
+            return cached
+
+        # 先尝试规则匹配（快速）: O(1) exact phrase hit first, then the
+        # single alternation scan for phrases embedded in longer text
+        if text in self.COMMON_PATTERNS:
+            pattern = text
+        else:
+            match = self._COMMON_PATTERN_RE.search(text)
+            pattern = match.group() if match else None
+        if pattern is not None:
+            result = {
+                "success": True,
+                "cron": self.COMMON_PATTERNS[pattern],
+                "description": f"匹配到模式: {pattern}",
+                "next_runs": self._get_next_runs(self.COMMON_PATTERNS[pattern]),
+                "source": "rule"
+            }
+            self._cache_put("cron", text, result)
+            return result
         
         # 使用 LLM 解析复杂描述
         if self.ollama_available:
-            prompt = f"""将以下自然语言转换为 Linux Cron 表达式（5个字段：分 时 日 月 周）。
-
+            # Terse prompt + tight output cap: decode latency scales
+            # with output tokens, far more than with prompt tokens
+            prompt = f"""将自然语言转换为5字段Cron表达式（分 时 日 月 周）。
 输入: "{text}"
+只输出JSON: {{"cron":"0 9 * * *","description":"每天早上9点执行","confidence":0.95}}
+无法解析时 cron 为 null。"""
 
-只返回 JSON 格式，不要其他解释：
-{{
-    "cron": "0 9 * * *",
-    "description": "每天早上9点执行",
-    "confidence": 0.95
-}}
-
-如果无法解析，返回:
-{{
-    "cron": null,
-    "description": "无法解析",
-    "confidence": 0
-}}"""
-            
             try:
-                result = self._call_llm(prompt)
-                # 提取 JSON
-                json_match = re.search(r'\{.*\}', result, re.DOTALL)
-                if json_match:
-                    data = json.loads(json_match.group())
+                data = self._call_llm_json(prompt, num_predict=80)
+                if data is not None:
                     if data.get("cron"):
-                        return {
+                        llm_result = {
                             "success": True,
                             "cron": data["cron"],
                             "description": data.get("description", "AI解析结果"),
@@ -166,24 +450,28 @@ class AIService:
                             "source": "llm",
                             "confidence": data.get("confidence", 0.8)
                         }
+                        self._cache_put("cron", text, llm_result)
+                        return llm_result
             except:
                 pass
         
         # 回退到规则解析
         result = self._parse_complex_description(text)
         if result:
-            return {
+            rule_result = {
                 "success": True,
                 "cron": result["cron"],
                 "description": result["description"],
                 "next_runs": self._get_next_runs(result["cron"]),
                 "source": "rule"
             }
+            self._cache_put("cron", text, rule_result)
+            return rule_result
         
         return {
             "success": False,
             "error": "无法解析该描述，请尝试: 每天、每小时、每周一、每5分钟等",
-            "suggestions": list(common_patterns.keys())[:5]
+            "suggestions": list(self.COMMON_PATTERNS.keys())[:5]
         }
     
     def _parse_complex_description(self, text: str) -> Optional[Dict[str, Any]]:
@@ -191,7 +479,7 @@ class AIService:
         text = text.lower()
         
         # 匹配 "每X分钟"
-        minute_match = re.search(r'每(\d+)分钟', text)
+        minute_match = _MINUTE_RE.search(text)
         if minute_match:
             minute = minute_match.group(1)
             return {
@@ -200,7 +488,7 @@ class AIService:
             }
         
         # 匹配 "每X小时"
-        hour_match = re.search(r'每(\d+)小时', text)
+        hour_match = _HOUR_RE.search(text)
         if hour_match:
             hour = hour_match.group(1)
             return {
@@ -209,7 +497,7 @@ class AIService:
             }
         
         # 匹配 "每天X点"
-        daily_match = re.search(r'每天.*?(\d+)[点:：]', text)
+        daily_match = _DAILY_RE.search(text)
         if daily_match:
             hour = daily_match.group(1)
             return {
@@ -221,7 +509,7 @@ class AIService:
         week_days = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "日": 0, "天": 0}
         for day_name, day_num in week_days.items():
             if f"周{day_name}" in text or f"星期{day_name}" in text:
-                time_match = re.search(r'(\d+)[点:：]', text)
+                time_match = _TIME_RE.search(text)
                 hour = time_match.group(1) if time_match else "0"
                 return {
                     "cron": f"0 {hour} * * {day_num}",
@@ -233,9 +521,7 @@ class AIService:
     def _get_next_runs(self, cron: str, count: int = 5) -> List[str]:
         """Get next execution times for a cron expression"""
         try:
-            from croniter import croniter
-            itr = croniter(cron, datetime.now())
-            return [itr.get_next(datetime).strftime("%Y-%m-%d %H:%M") for _ in range(count)]
+            return list(_next_runs_cached(cron, count, int(time.time() // 60)))
         except:
             return []
     
@@ -249,30 +535,22 @@ class AIService:
                 "source": "rule"
             }
         
-        # 使用 LLM 分析复杂错误
-        if self.ollama_available and len(error_message) > 50:
-            prompt = f"""分析以下任务错误并提供解决方案。
+        # 规则优先：识别出的错误和短消息直接走规则，零 LLM 成本
+        rule_result = self._rule_based_error_analysis(error_message, task_type)
+        if rule_result["category"] != "unknown" or len(error_message) < 80:
+            return rule_result
 
+        # 使用 LLM 分析复杂错误
+        if self.ollama_available:
+            prompt = f"""分析任务错误并给出解决方案。
 任务类型: {task_type}
-错误信息:
-{error_message[:500]}
-
-输出内容:
-{output[:500] if output else "无"}
-
-返回 JSON 格式:
-{{
-    "category": "错误类别",
-    "root_cause": "根本原因",
-    "solutions": ["解决方案1", "解决方案2", "解决方案3"],
-    "prevention": "预防措施"
-}}"""
-            
+错误信息: {error_message[:300]}
+输出内容: {output[:300] if output else "无"}
+只输出JSON: {{"category":"错误类别","root_cause":"根本原因","solutions":["方案1","方案2"]}}"""
+
             try:
-                result = self._call_llm(prompt)
-                json_match = re.search(r'\{.*\}', result, re.DOTALL)
-                if json_match:
-                    data = json.loads(json_match.group())
+                data = self._call_llm_json(prompt)
+                if data is not None:
                     return {
                         "category": data.get("category", "unknown"),
                         "root_cause": data.get("root_cause", ""),
@@ -285,72 +563,72 @@ class AIService:
                 pass
         
         # 回退到规则分析
-        return self._rule_based_error_analysis(error_message, task_type)
-    
+        return rule_result
+
     def _rule_based_error_analysis(self, error_message: str, task_type: str) -> Dict[str, Any]:
-        """Rule-based error analysis"""
-        error_lower = error_message.lower()
-        suggestions = []
-        category = "unknown"
-        
-        if task_type == "http":
-            if "timeout" in error_lower:
-                category, suggestions = "timeout", ["增加超时时间", "检查服务器状态"]
-            elif "404" in error_message:
-                category, suggestions = "not_found", ["检查URL路径"]
-            elif "401" in error_message or "403" in error_message:
-                category, suggestions = "auth", ["检查认证信息"]
-        
-        elif task_type == "shell":
-            if "command not found" in error_lower:
-                category, suggestions = "command_not_found", ["检查命令是否安装"]
-            elif "permission denied" in error_lower:
-                category, suggestions = "permission", ["检查文件权限"]
-        
-        elif task_type == "python":
-            if "module not found" in error_lower:
-                category, suggestions = "import_error", ["安装缺失模块"]
-            elif "syntaxerror" in error_lower:
-                category, suggestions = "syntax_error", ["检查代码语法"]
-        
-        if not suggestions:
-            suggestions = ["查看完整日志", "检查配置", "手动测试"]
-        
-        return {
-            "category": category,
-            "suggestions": suggestions,
-            "confidence": 0.6,
-            "source": "rule"
-        }
+        """Rule-based error analysis.
+
+        A repeatedly failing cron task reports the same error every
+        run; key the memoized classifier on a 200-char prefix so those
+        repeats skip the scan entirely.
+        """
+        return _classify_error(error_message[:200], task_type)
     
+    async def natural_language_to_cron_async(self, text: str) -> Dict[str, Any]:
+        """Async wrapper; runs the blocking LLM call in a worker thread so
+        independent calls can overlap (see parse_task)."""
+        return await asyncio.to_thread(self.natural_language_to_cron, text)
+
+    async def suggest_task_config_async(self, description: str) -> Dict[str, Any]:
+        """Async wrapper for suggest_task_config"""
+        return await asyncio.to_thread(self.suggest_task_config, description)
+
+    async def generate_task_name_async(self, description: str) -> str:
+        """Async wrapper for generate_task_name"""
+        return await asyncio.to_thread(self.generate_task_name, description)
+
+    async def analyze_error_async(self, error_message: str, task_type: str,
+                                  output: str = "") -> Dict[str, Any]:
+        """Analyze an error without blocking the event loop.
+
+        The memoized rule classifier answers first when it recognizes
+        the error; only unrecognized errors pay LLM latency (in a
+        worker thread).
+        """
+        if not error_message:
+            return self.analyze_error(error_message, task_type, output)
+
+        rule_result = self._rule_based_error_analysis(error_message, task_type)
+        if rule_result["category"] != "unknown":
+            return rule_result
+
+        return await asyncio.to_thread(
+            self.analyze_error, error_message, task_type, output
+        )
+
     def suggest_task_config(self, description: str) -> Dict[str, Any]:
         """Suggest task configuration using LLM"""
+        cached = self._cache_get("suggest", description)
+        if cached is not None:
+            return cached
+
         if self.ollama_available:
             prompt = f"""根据描述推荐任务配置。
-
 描述: "{description}"
-
-返回 JSON:
-{{
-    "task_type": "http|shell|python|backup",
-    "task_name": "建议的任务名称",
-    "cron": "0 9 * * *",
-    "config": {{
-        "关键配置项": "值"
-    }},
-    "tips": ["提示1", "提示2"]
-}}"""
+只输出JSON: {{"task_type":"http|shell|python|backup","task_name":"任务名称","cron":"0 9 * * *","config":{{"关键配置项":"值"}},"tips":["提示1"]}}"""
             
             try:
-                result = self._call_llm(prompt)
-                json_match = re.search(r'\{.*\}', result, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
+                suggestion = self._call_llm_json(prompt)
+                if suggestion is not None:
+                    self._cache_put("suggest", description, suggestion)
+                    return suggestion
             except:
                 pass
-        
+
         # 回退到规则
-        return self._rule_based_suggestion(description)
+        suggestion = self._rule_based_suggestion(description)
+        self._cache_put("suggest", description, suggestion)
+        return suggestion
     
     def _rule_based_suggestion(self, description: str) -> Dict[str, Any]:
         """Rule-based task suggestion"""
@@ -383,6 +661,12 @@ class AIService:
     
     def chat_assistant(self, message: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """AI chat assistant using local LLM"""
+        # Keyword intents (create task, cron help) have canned answers;
+        # skip the LLM round-trip entirely when one matches
+        rule_result = self._rule_based_chat(message)
+        if rule_result["type"] != "general":
+            return rule_result
+
         if self.ollama_available:
             system_prompt = """你是 TaskFlow 智能助手，帮助用户管理定时任务。
 你可以：
@@ -393,7 +677,7 @@ class AIService:
 
 回复简洁，用中文。"""
             
-            context_str = f"\n上下文: {json.dumps(context, ensure_ascii=False)}" if context else ""
+            context_str = f"\n上下文: {orjson.dumps(context).decode()}" if context else ""
             prompt = f"用户: {message}{context_str}"
             
             response = self._call_llm(prompt, system_prompt)
@@ -406,25 +690,89 @@ class AIService:
                 }
         
         # 回退到规则
-        return self._rule_based_chat(message)
-    
+        return rule_result
+
+    def chat_assistant_stream(self, message: str, context: Dict[str, Any] = None):
+        """Stream chat assistant tokens as they arrive from the LLM.
+
+        Yields text fragments; falls back to the rule-based reply as a
+        single fragment when the LLM is unavailable or errors out.
+        """
+        rule_result = self._rule_based_chat(message)
+        if rule_result["type"] != "general":
+            yield rule_result["response"]
+            return
+
+        if self.ollama_available:
+            system_prompt = """你是 TaskFlow 智能助手，帮助用户管理定时任务。
+你可以：
+1. 解析自然语言创建任务
+2. 转换时间描述为 Cron 表达式
+3. 分析任务错误
+4. 推荐任务配置
+
+回复简洁，用中文。"""
+
+            context_str = f"\n上下文: {orjson.dumps(context).decode()}" if context else ""
+            prompt = f"用户: {message}{context_str}"
+
+            try:
+                self._rate_limit()
+                with self._llm_semaphore:
+                    if self._openai_session is not None:
+                        # SSE stream from the OpenAI-compatible backend,
+                        # so first tokens reach the client immediately
+                        resp = self._openai_session.post(
+                            f"{self.openai_base_url}/v1/chat/completions",
+                            json={
+                                "model": self.model,
+                                "messages": [
+                                    {"role": "system", "content": system_prompt},
+                                    {"role": "user", "content": prompt}
+                                ],
+                                "temperature": 0.3,
+                                "stream": True
+                            },
+                            timeout=60,
+                            stream=True
+                        )
+                        resp.raise_for_status()
+                        for line in resp.iter_lines():
+                            if not line.startswith(b"data: "):
+                                continue
+                            data = line[len(b"data: "):]
+                            if data == b"[DONE]":
+                                break
+                            delta = orjson.loads(data)["choices"][0].get("delta", {})
+                            content = delta.get("content")
+                            if content:
+                                yield content
+                        return
+                    stream = self._ollama.chat(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt}
+                        ],
+                        options={**self.OLLAMA_OPTIONS, "temperature": 0.3},
+                        stream=True
+                    )
+                    for chunk in stream:
+                        content = chunk.get('message', {}).get('content', '')
+                        if content:
+                            yield content
+                return
+            except Exception as e:
+                print(f"LLM流式调用失败: {e}")
+
+        yield rule_result["response"]
+
     def _rule_based_chat(self, message: str) -> Dict[str, Any]:
         """Rule-based chat fallback"""
-        msg_lower = message.lower()
-        
-        if any(kw in msg_lower for kw in ["创建", "新建", "添加"]):
-            return {
-                "type": "create_task",
-                "response": "我来帮您创建任务。请描述：\n1. 任务要做什么？\n2. 什么时候执行？",
-                "action": "open_task_modal"
-            }
-        elif any(kw in msg_lower for kw in ["cron", "定时", "表达式"]):
-            return {
-                "type": "cron_help",
-                "response": "Cron 格式：分 时 日 月 周\n示例：0 9 * * *（每天9点）",
-                "action": "show_cron_helper"
-            }
-        
+        match = _CHAT_RE.search(message.lower())
+        if match:
+            return dict(_CHAT_OUTCOMES[match.lastindex - 1])
+
         return {
             "type": "general",
             "response": "您好！我是 TaskFlow AI 助手。\n我可以帮您创建任务、解析 Cron 表达式、分析错误。\n请告诉我需要什么帮助？",
@@ -433,6 +781,10 @@ class AIService:
     
     def generate_task_name(self, description: str) -> str:
         """Generate a concise task name from description"""
+        cached = self._cache_get("name", description)
+        if cached is not None:
+            return cached
+
         if self.ollama_available:
             prompt = f"""根据以下描述生成一个简短的任务名称（2-6个字）：
 
@@ -444,31 +796,42 @@ class AIService:
                 result = self._call_llm(prompt)
                 name = result.strip().strip('"').strip("'")
                 if name and len(name) <= 20:
+                    self._cache_put("name", description, name)
                     return name
             except:
                 pass
-        
+
         # 回退到规则生成
         name = description[:10] if len(description) <= 10 else description[:10] + "..."
+        self._cache_put("name", description, name)
         return name
     
     def get_status(self) -> Dict[str, Any]:
-        """Get AI service status"""
-        return {
-            "available": self.ollama_available,
-            "ollama_running": self.ollama_available,
-            "model": self.model if self.ollama_available else None,
-            "available_models": self.available_models,
-            "mode": "llm" if self.ollama_available else "rule_only"
-        }
-    
+        """Get AI service status.
+
+        The dict is rebuilt only after set_model/_check_ollama change
+        something; status is polled by the UI, so the hot path is a
+        cached read with no allocation.
+        """
+        if self._status_cache is None:
+            self._status_cache = {
+                "available": self.ollama_available,
+                "ollama_running": self.ollama_available,
+                "model": self.model if self.ollama_available else None,
+                "available_models": self.available_models,
+                "mode": "llm" if self.ollama_available else "rule_only",
+                "max_concurrency": self.max_concurrency
+            }
+        return self._status_cache
+
     def get_available_models(self) -> List[str]:
         """Get list of available local models"""
         return self.available_models
-    
+
     def set_model(self, model_name: str) -> bool:
         """Change the active model"""
         if model_name in self.available_models:
             self.model = model_name
+            self._status_cache = None
             return True
         return False
@@ -0,0 +1,91 @@
+"""
+IMAP connection pool - keeps authenticated connections alive across
+import calls so each request skips the TLS handshake + LOGIN + SELECT
+cost, and parallel fetches don't trigger reconnect storms.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from loguru import logger
+
+REAP_INTERVAL = 60.0
+
+
+class ImapPool:
+    def __init__(self, open_conn, max_size=8, idle_timeout=300.0, max_lifetime=1800.0):
+        """open_conn: blocking callable returning an authenticated connection"""
+        self._open_conn = open_conn
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._max_lifetime = max_lifetime
+        self._idle = deque()  # (conn, last_used, created)
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._reaper = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Check out a pooled connection, opening one if none are idle"""
+        if self._reaper is None:
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_idle())
+
+        await self._semaphore.acquire()
+        try:
+            conn = self._checkout()
+            if conn is None:
+                conn = await asyncio.to_thread(self._open_conn)
+                conn._pool_created = time.monotonic()
+            try:
+                yield conn
+            except Exception:
+                # Connection state is unknown after a failure; drop it
+                await asyncio.to_thread(self._discard, conn)
+                raise
+            self._idle.append((conn, time.monotonic(), getattr(conn, "_pool_created", time.monotonic())))
+        finally:
+            self._semaphore.release()
+
+    def close(self):
+        """Drop all idle connections and stop the reaper"""
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        while self._idle:
+            conn, _, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _checkout(self):
+        now = time.monotonic()
+        while self._idle:
+            conn, last_used, created = self._idle.popleft()
+            if now - last_used > self._idle_timeout or now - created > self._max_lifetime:
+                self._discard(conn)
+                continue
+            conn._pool_created = created
+            return conn
+        return None
+
+    def _discard(self, conn):
+        try:
+            conn.logout()
+        except Exception:
+            pass
+
+    async def _reap_idle(self):
+        """Keep healthy idle connections alive and recycle stale ones"""
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            survivors = deque()
+            while self._idle:
+                conn, last_used, created = self._idle.popleft()
+                if now - last_used > self._idle_timeout or now - created > self._max_lifetime:
+                    await asyncio.to_thread(self._discard, conn)
+                    continue
+                try:
+                    await asyncio.to_thread(conn.noop)
+                    survivors.append((conn, last_used, created))
+                except Exception as e:
+                    logger.warning(f"Dropping dead IMAP connection: {e}")
+                    await asyncio.to_thread(self._discard, conn)
+            self._idle.extend(survivors)
@@ -1 +0,0 @@
-services/init.py
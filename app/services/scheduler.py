@@ -1,62 +1,379 @@
 """
 Task Scheduler Service - Manages APScheduler and task lifecycle
 """
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List
 import asyncio
+import os
+import threading
 from loguru import logger
 
-from app.models import Task, TaskLog
+from sqlalchemy import case, func, update
+
+from app.config import settings
+from app.models import Task, TaskLog, TaskStatsMV
 from app.models.schemas import TaskType
 from app.services.executor import TaskExecutor
 
+STATS_FLUSH_BATCH = 200
+LOG_FLUSH_BATCH = 500
+
+# String -> member map; a plain dict hit beats Enum.__call__'s
+# __new__/_missing_ chain on the per-tick coercion
+_TASK_TYPES = {m.value: m for m in TaskType}
+
+
+@lru_cache(maxsize=1024)
+def _build_cron_trigger(expr: str) -> CronTrigger:
+    """Build a CronTrigger for a 5-field cron expression, memoized.
+
+    Field expansion is regex-heavy and many tasks share expressions, so
+    repeated scheduling/updating reuses one trigger. Triggers are
+    immutable with respect to the expression, so sharing is safe.
+    Raises ValueError for anything that is not 5 fields.
+    """
+    parts = expr.split()
+    if len(parts) != 5:
+        raise ValueError(f"Invalid cron expression: {expr}")
+    return CronTrigger(
+        minute=parts[0],
+        hour=parts[1],
+        day=parts[2],
+        month=parts[3],
+        day_of_week=parts[4]
+    )
+
+
+# Pre-parse the ubiquitous schedules at import so even the first
+# add_task for one of them takes the cached path
+for _expr in ("* * * * *", "0 * * * *", "0 0 * * *", "0 9 * * *", "0 2 * * *",
+              "*/5 * * * *", "*/10 * * * *", "*/30 * * * *"):
+    _build_cron_trigger(_expr)
+del _expr
+
+
+@lru_cache(maxsize=1024)
+def _trigger_str(expr: str) -> str:
+    """Stringified trigger for an expression; str(CronTrigger) reformats
+    every field, so cache it alongside the trigger itself."""
+    return str(_build_cron_trigger(expr))
+
 class TaskSchedulerService:
-    def __init__(self, db_session):
-        self.db = db_session
-        self.scheduler = AsyncIOScheduler()
-        self.executor = TaskExecutor()
-        self._running_tasks = set()
-        
+    # Process-wide scheduler/executor singletons. Each AsyncIOScheduler
+    # allocates its own jobstore, executor, and timer, and two live
+    # schedulers in one process mean duplicate job fires — so repeated
+    # service construction must reuse the same instances. Only one
+    # instance should call start()/shutdown() (main.py's lifespan does).
+    _shared_scheduler = None
+    _shared_executor = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def _get_scheduler(cls) -> AsyncIOScheduler:
+        with cls._shared_lock:
+            if cls._shared_scheduler is None:
+                cls._shared_scheduler = AsyncIOScheduler()
+            return cls._shared_scheduler
+
+    @classmethod
+    def _get_executor(cls) -> TaskExecutor:
+        with cls._shared_lock:
+            if cls._shared_executor is None:
+                cls._shared_executor = TaskExecutor()
+            return cls._shared_executor
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.scheduler = self._get_scheduler()
+        self.executor = self._get_executor()
+        # Per-task locks: membership check + acquire is a single
+        # non-yielding operation, so overlapping ticks can't both start
+        self._task_locks: dict = {}
+        self.stats_queue = asyncio.Queue()
+        self._stats_flusher = None
+        self.outbox = asyncio.Queue()
+        self._outbox_worker = None
+        # Notifications are fire-and-forget: the run path must not stall
+        # behind SMTP/webhook latency. The set keeps strong references to
+        # in-flight tasks; the semaphore caps concurrent outbound sends.
+        self._pending_notifs: set = set()
+        self._notif_sem = asyncio.Semaphore(16)
+        # Completion writes from scheduled runs are batched, trading a
+        # moment of visibility lag for one commit per flush
+        self.log_queue = asyncio.Queue()
+        self._log_flusher = None
+        # Session calls are blocking; running them here keeps the
+        # scheduler loop free to interleave concurrent task ticks
+        self._db_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="sched-db")
+        # job_id -> stringified trigger, filled at schedule time so the
+        # jobs endpoint never re-formats cron fields per poll
+        self._trigger_strs: dict = {}
+        # job_id -> live Job reference. APScheduler mutates next_run_time
+        # on the stored instance when a job fires, so holding the object
+        # returned by add_job lets _run_task read the updated value
+        # without going through get_job's jobstore lock
+        self._jobs: dict = {}
+        # Backpressure across jobs: max_instances=1 only limits reruns
+        # of one job, so a burst of distinct tasks could otherwise fork
+        # unbounded processes / open unbounded sockets. Compute-bound
+        # types get a CPU-sized pool; I/O-bound types a wider one.
+        self._compute_sem = asyncio.Semaphore(os.cpu_count() or 4)
+        self._io_sem = asyncio.Semaphore(50)
+
     def start(self):
         """Start the scheduler"""
         self.scheduler.start()
+        self._stats_flusher = asyncio.get_event_loop().create_task(self._flush_stats())
+        self._outbox_worker = asyncio.get_event_loop().create_task(self._drain_outbox())
+        self._log_flusher = asyncio.get_event_loop().create_task(self._flush_logs())
+        self.refresh_stats_mv()
         logger.info("Task scheduler started")
-        
+
     def shutdown(self):
         """Shutdown the scheduler"""
         self.scheduler.shutdown()
+        if self._stats_flusher:
+            self._stats_flusher.cancel()
+            self._stats_flusher = None
+        if self._outbox_worker:
+            self._outbox_worker.cancel()
+            self._outbox_worker = None
+        if self._log_flusher:
+            self._log_flusher.cancel()
+            self._log_flusher = None
+        for notif in self._pending_notifs:
+            notif.cancel()
+        self._flush_stats_batch(self._drain_stats_queue())
+        self._flush_log_batch(self._drain_log_queue())
+        self._db_executor.shutdown(wait=False, cancel_futures=True)
         logger.info("Task scheduler shutdown")
+
+    async def _run_db(self, fn, *args):
+        """Run a blocking DB function in the scheduler's thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, fn, *args)
+
+    def _record_run(self, task_id: int, status: str, run_at: datetime):
+        """Queue a counter update instead of writing it in the run path."""
+        self.stats_queue.put_nowait({"task_id": task_id, "status": status, "run_at": run_at})
+
+    def _drain_stats_queue(self, limit: int = STATS_FLUSH_BATCH) -> list:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.stats_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def _flush_stats_batch(self, batch: list):
+        if not batch:
+            return
+
+        # Aggregate per task so each flush issues one UPDATE per task
+        stats = {}
+        for item in batch:
+            entry = stats.setdefault(item["task_id"], {"runs": 0, "successes": 0, "failures": 0, "last_run_at": None})
+            entry["runs"] += 1
+            if item["status"] == "success":
+                entry["successes"] += 1
+            else:
+                entry["failures"] += 1
+            if entry["last_run_at"] is None or item["run_at"] > entry["last_run_at"]:
+                entry["last_run_at"] = item["run_at"]
+
+        with self.session_factory() as db:
+            for task_id, entry in stats.items():
+                db.execute(
+                    update(Task)
+                    .where(Task.id == task_id)
+                    .values(
+                        run_count=Task.run_count + entry["runs"],
+                        success_count=Task.success_count + entry["successes"],
+                        failure_count=Task.failure_count + entry["failures"],
+                        last_run_at=entry["last_run_at"],
+                    )
+                )
+            self._refresh_stats_mv(db)
+            db.commit()
+
+    def _drain_log_queue(self, limit: int = LOG_FLUSH_BATCH) -> list:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.log_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def _flush_log_batch(self, batch: list):
+        """Apply queued completion writes in one transaction.
+
+        Each item carries a TaskLog update mapping and a Task update
+        mapping; bulk_update_mappings turns them into executemany
+        UPDATEs, so a burst of finished runs costs one commit.
+        """
+        if not batch:
+            return
+
+        with self.session_factory() as db:
+            log_inserts = [item["log_insert"] for item in batch if "log_insert" in item]
+            log_updates = [item["log"] for item in batch if "log" in item]
+            if log_inserts:
+                db.bulk_insert_mappings(TaskLog, log_inserts)
+            if log_updates:
+                db.bulk_update_mappings(TaskLog, log_updates)
+            task_rows = [item["task"] for item in batch]
+            # Uniform key sets per executemany group
+            with_next = [r for r in task_rows if "next_run_at" in r]
+            without_next = [r for r in task_rows if "next_run_at" not in r]
+            if with_next:
+                db.bulk_update_mappings(Task, with_next)
+            if without_next:
+                db.bulk_update_mappings(Task, without_next)
+            db.commit()
+
+    async def _flush_logs(self):
+        """Background consumer: batch completion writes into one transaction."""
+        while True:
+            first = await self.log_queue.get()
+            batch = [first] + self._drain_log_queue(LOG_FLUSH_BATCH - 1)
+            try:
+                await self._run_db(self._flush_log_batch, batch)
+            except Exception as e:
+                logger.error("Failed to flush task logs: {}", e)
+
+    async def _flush_stats(self):
+        """Background consumer: batch counter updates into one transaction."""
+        while True:
+            first = await self.stats_queue.get()
+            batch = [first] + self._drain_stats_queue(STATS_FLUSH_BATCH - 1)
+            try:
+                await self._run_db(self._flush_stats_batch, batch)
+            except Exception as e:
+                logger.error("Failed to flush task stats: {}", e)
         
+    def enqueue(self, op: str, task_id: int):
+        """Queue a scheduler change ("add"/"update"/"remove") for a task.
+
+        Mutation endpoints call this instead of awaiting the scheduler
+        inline, so request latency stays decoupled from scheduler work.
+        """
+        self.outbox.put_nowait((op, task_id))
+
+    async def _drain_outbox(self):
+        """Background consumer applying queued scheduler changes.
+
+        Drains what is queued and keeps only the last op per task, so a
+        burst of rapid toggles coalesces into one scheduler change.
+        """
+        while True:
+            op, task_id = await self.outbox.get()
+            batch = {task_id: op}
+            while True:
+                try:
+                    next_op, next_id = self.outbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                batch[next_id] = next_op
+
+            for tid, pending_op in batch.items():
+                try:
+                    await self._apply_outbox_op(pending_op, tid)
+                except Exception as e:
+                    logger.error("Failed to apply scheduler change {} for task {}: {}", pending_op, tid, e)
+
+    def _load_task_db(self, task_id: int) -> Optional[Task]:
+        """Worker-thread phase: fetch a task detached from its session"""
+        with self.session_factory() as db:
+            task = db.get(Task, task_id)
+            if task is not None:
+                db.expunge(task)
+            return task
+
+    async def _apply_outbox_op(self, op: str, task_id: int):
+        # All session work goes through _run_db: the request that queued
+        # the op may still hold the single write connection until its
+        # teardown, and waiting for it must not block the event loop
+        if op == "remove":
+            await self.remove_task(task_id)
+            return
+
+        task = await self._run_db(self._load_task_db, task_id)
+        if task is None:
+            return
+        if op == "update":
+            await self.update_task(task)
+        else:
+            await self.add_task(task)
+
+    def _refresh_stats_mv(self, db):
+        """Recompute the materialized dashboard counters into task_stats_mv.
+
+        Event-driven refresh: called on task-state transitions (schedule,
+        remove, stats flush) so dashboard reads never pay for aggregation.
+        """
+        # Conditional aggregation: one scan of each table instead of a
+        # round-trip per counter
+        total_tasks, active_tasks, running_tasks = db.query(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.is_active == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Task.is_running == True, 1), else_=0)), 0),
+        ).one()
+        total_runs, success_runs = db.query(
+            func.count(TaskLog.id),
+            func.coalesce(func.sum(case((TaskLog.status == "success", 1), else_=0)), 0),
+        ).one()
+
+        row = db.query(TaskStatsMV).filter(TaskStatsMV.id == 1).first()
+        if row is None:
+            row = TaskStatsMV(id=1)
+            db.add(row)
+        row.total_tasks = total_tasks
+        row.active_tasks = active_tasks
+        row.running_tasks = running_tasks
+        row.total_runs = total_runs
+        row.success_runs = success_runs
+        row.updated_at = datetime.utcnow()
+
+    def refresh_stats_mv(self):
+        """Refresh the stats row in its own transaction"""
+        try:
+            with self.session_factory() as db:
+                self._refresh_stats_mv(db)
+                db.commit()
+        except Exception as e:
+            logger.error("Failed to refresh dashboard stats: {}", e)
+
     async def add_task(self, task: Task) -> bool:
         """Add a task to the scheduler"""
         try:
             job_id = f"task_{task.id}"
-            
-            # Remove existing job if present
-            if self.scheduler.get_job(job_id):
-                self.scheduler.remove_job(job_id)
-            
+
             if not task.is_active:
+                # Deactivation: drop any existing job and stop here
+                try:
+                    self.scheduler.remove_job(job_id)
+                except JobLookupError:
+                    pass
+                self._trigger_strs.pop(job_id, None)
+                self._jobs.pop(job_id, None)
                 return True
-            
-            # Parse cron expression
-            cron_parts = task.cron_expression.split()
-            if len(cron_parts) != 5:
-                logger.error(f"Invalid cron expression for task {task.id}: {task.cron_expression}")
+
+            # Parse cron expression (memoized across tasks)
+            try:
+                trigger = _build_cron_trigger(task.cron_expression)
+            except ValueError:
+                logger.error("Invalid cron expression for task {}: {}", task.id, task.cron_expression)
                 return False
-            
-            trigger = CronTrigger(
-                minute=cron_parts[0],
-                hour=cron_parts[1],
-                day=cron_parts[2],
-                month=cron_parts[3],
-                day_of_week=cron_parts[4]
-            )
-            
-            # Add job to scheduler
-            self.scheduler.add_job(
+
+            # replace_existing makes add_job an upsert, and the returned
+            # Job carries next_run_time — no jobstore re-scan needed
+            job = self.scheduler.add_job(
                 func=self._run_task,
                 trigger=trigger,
                 id=job_id,
@@ -65,174 +382,324 @@ class TaskSchedulerService:
                 max_instances=1,
                 coalesce=True
             )
-            
-            # Update next run time
-            job = self.scheduler.get_job(job_id)
-            if job:
-                task.next_run_at = job.next_run_time
-                self.db.commit()
-            
-            logger.info(f"Task {task.id} ({task.name}) scheduled with cron: {task.cron_expression}")
+
+            self._trigger_strs[job_id] = _trigger_str(task.cron_expression)
+            self._jobs[job_id] = job
+
+            task.next_run_at = job.next_run_time
+            await self._run_db(self._set_next_run_db, task.id, job.next_run_time)
+
+            await self._run_db(self.refresh_stats_mv)
+            logger.info("Task {} ({}) scheduled with cron: {}", task.id, task.name, task.cron_expression)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to schedule task {task.id}: {e}")
+            logger.error("Failed to schedule task {}: {}", task.id, e)
             return False
     
+    async def add_tasks_bulk(self, tasks) -> int:
+        """Schedule many tasks at once, committing next_run_at in one transaction.
+
+        Accepts Task instances or any row-like objects exposing id, name,
+        cron_expression, and is_active, so callers can feed lightweight
+        Core rows instead of full ORM instances. Avoids the per-task
+        commit that add_task does, which turns startup into O(N)
+        transactions.
+        """
+        next_run_updates = []
+        scheduled = 0
+
+        for task in tasks:
+            if not task.is_active:
+                continue
+
+            try:
+                trigger = _build_cron_trigger(task.cron_expression)
+            except ValueError:
+                logger.error("Invalid cron expression for task {}: {}", task.id, task.cron_expression)
+                continue
+
+            job = self.scheduler.add_job(
+                func=self._run_task,
+                trigger=trigger,
+                id=f"task_{task.id}",
+                args=[task.id],
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+            self._trigger_strs[job.id] = _trigger_str(task.cron_expression)
+            self._jobs[job.id] = job
+            next_run_updates.append({"id": task.id, "next_run_at": job.next_run_time})
+            scheduled += 1
+
+        if next_run_updates:
+            await self._run_db(self._bulk_set_next_runs_db, next_run_updates)
+
+        logger.info("Scheduled {} tasks in bulk", scheduled)
+        return scheduled
+
+    def _set_next_run_db(self, task_id: int, next_run_time):
+        """Worker-thread phase: persist a task's next_run_at"""
+        with self.session_factory() as db:
+            db.query(Task).filter(Task.id == task_id).update(
+                {"next_run_at": next_run_time}
+            )
+            db.commit()
+
+    def _bulk_set_next_runs_db(self, next_run_updates: list):
+        """Worker-thread phase: persist next_run_at for many tasks at once"""
+        with self.session_factory() as db:
+            db.bulk_update_mappings(Task, next_run_updates)
+            db.commit()
+
     async def remove_task(self, task_id: int):
         """Remove a task from the scheduler"""
-        job_id = f"task_{task_id}"
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
-            logger.info(f"Task {task_id} removed from scheduler")
-    
+        try:
+            self.scheduler.remove_job(f"task_{task_id}")
+        except JobLookupError:
+            return
+        self._trigger_strs.pop(f"task_{task_id}", None)
+        self._jobs.pop(f"task_{task_id}", None)
+        await self._run_db(self.refresh_stats_mv)
+        logger.info("Task {} removed from scheduler", task_id)
+
     async def update_task(self, task: Task) -> bool:
-        """Update a scheduled task"""
-        await self.remove_task(task.id)
+        """Update a scheduled task; add_task upserts the job in place"""
         return await self.add_task(task)
     
     async def _run_task(self, task_id: int):
         """Execute a task (called by scheduler)"""
-        if task_id in self._running_tasks:
-            logger.warning(f"Task {task_id} is already running, skipping")
+        lock = self._task_locks.setdefault(task_id, asyncio.Lock())
+        if lock.locked():
+            logger.warning("Task {} is already running, skipping", task_id)
             return
-        
-        self._running_tasks.add(task_id)
-        task = None
-        
+
+        await lock.acquire()
+
+        started = False
         try:
-            # Get task from database
-            task = self.db.query(Task).filter(Task.id == task_id).first()
-            if not task or not task.is_active:
+            info = await self._run_db(self._begin_run_db, task_id, "scheduled")
+            if info is None:
                 return
-            
-            # Update task status
-            task.is_running = True
-            task.last_run_at = datetime.utcnow()
-            task.run_count += 1
-            self.db.commit()
-            
-            # Create log entry
-            log = TaskLog(
-                task_id=task.id,
-                task_name=task.name,
-                status="running",
-                trigger_type="scheduled"
-            )
-            self.db.add(log)
-            self.db.commit()
-            
-            # Execute task
-            result = await self.executor.execute(
-                task.id,
-                task.name,
-                TaskType(task.task_type),
-                task.config
-            )
-            
-            # Update log
-            log.status = result["status"]
-            log.completed_at = result["completed_at"]
-            log.duration_ms = result["duration_ms"]
-            log.output = result["output"]
-            log.error_message = result["error_message"]
-            log.exit_code = result["exit_code"]
-            
-            # Update task stats
-            if result["status"] == "success":
-                task.success_count += 1
+            started = True
+
+            # Execute task under the type-appropriate concurrency pool
+            task_type = _TASK_TYPES[info["task_type"]]
+            async with self._exec_sem(task_type):
+                result = await self.executor.execute(
+                    task_id,
+                    info["name"],
+                    task_type,
+                    info["config"]
+                )
+
+            job = self._jobs.get(f"task_{task_id}")
+            next_run = job.next_run_time if job else None
+
+            # Scheduled completions go through the batching queue; the
+            # log row briefly stays "running" until the next flush
+            task_row = {"id": task_id, "is_running": False}
+            if next_run is not None:
+                task_row["next_run_at"] = next_run
+            log_fields = {
+                "status": result["status"],
+                "completed_at": result["completed_at"],
+                "duration_ms": result["duration_ms"],
+                "output": result["output"],
+                "error_message": result["error_message"],
+                "exit_code": result["exit_code"],
+            }
+            if info["log_id"] is not None:
+                item = {"log": {"id": info["log_id"], **log_fields}}
             else:
-                task.failure_count += 1
-            
-            task.is_running = False
-            
-            # Update next run time
-            job = self.scheduler.get_job(f"task_{task.id}")
-            if job:
-                task.next_run_at = job.next_run_time
-            
-            self.db.commit()
-            
-            # Send notification if configured
-            if (result["status"] == "failed" and task.notify_on_failure) or \
-               (result["status"] == "success" and task.notify_on_success):
-                await self._send_notification(task, result)
-            
-            logger.info(f"Task {task_id} completed with status: {result['status']}")
-            
+                # Default mode: the run's only task_logs write is this
+                # single completed row
+                item = {"log_insert": {
+                    "task_id": task_id,
+                    "task_name": info["name"],
+                    "trigger_type": "scheduled",
+                    "started_at": info["run_at"],
+                    **log_fields,
+                }}
+            item["task"] = task_row
+            self.log_queue.put_nowait(item)
+
+            self._record_run(task_id, result["status"], info["run_at"])
+
+            # Send notification if configured, off the critical path
+            if (result["status"] == "failed" and info["notify_on_failure"]) or \
+               (result["status"] == "success" and info["notify_on_success"]):
+                notif = asyncio.create_task(
+                    self._send_notification_guarded(task_id, info["notification_email"], result)
+                )
+                self._pending_notifs.add(notif)
+                notif.add_done_callback(self._pending_notifs.discard)
+
+            logger.info("Task {} completed with status: {}", task_id, result["status"])
+
         except Exception as e:
-            logger.error(f"Error running task {task_id}: {e}")
-            if task:
-                task.is_running = False
-                self.db.commit()
+            logger.error("Error running task {}: {}", task_id, e)
+            if started:
+                await self._run_db(self._clear_running_db, task_id)
         finally:
-            self._running_tasks.discard(task_id)
-    
+            lock.release()
+            # Nothing can be waiting (overlapping ticks skip instead),
+            # so drop the entry rather than keeping a lock per task
+            self._task_locks.pop(task_id, None)
+
+    def _exec_sem(self, task_type: TaskType) -> asyncio.Semaphore:
+        """Concurrency pool for a task type: HTTP waits on sockets, the
+        rest spawn processes or hit the disk."""
+        return self._io_sem if task_type == TaskType.HTTP else self._compute_sem
+
+    def _begin_run_db(self, task_id: int, trigger_type: str) -> Optional[dict]:
+        """Worker-thread phase: mark the task running.
+
+        Returns a plain snapshot of the fields the async side needs, so
+        no ORM instance crosses the thread boundary. A "running" log row
+        is only inserted when log_running_state is set — Task.is_running
+        already carries the in-flight state for the UI, so by default a
+        run writes task_logs exactly once, at completion.
+        """
+        with self.session_factory() as db:
+            task = db.get(Task, task_id)
+            if not task:
+                return None
+            if trigger_type == "scheduled" and not task.is_active:
+                return None
+
+            task.is_running = True
+            log = None
+            if settings.log_running_state:
+                log = TaskLog(
+                    task_id=task.id,
+                    task_name=task.name,
+                    status="running",
+                    trigger_type=trigger_type
+                )
+                db.add(log)
+            db.commit()
+
+            return {
+                "log_id": log.id if log is not None else None,
+                "trigger_type": trigger_type,
+                "run_at": datetime.utcnow(),
+                "name": task.name,
+                "task_type": task.task_type,
+                "config": task.config,
+                "notify_on_failure": task.notify_on_failure,
+                "notify_on_success": task.notify_on_success,
+                "notification_email": task.notification_email,
+            }
+
+    def _finish_run_db(self, task_id: int, info: dict, result: dict,
+                       next_run_time) -> Optional[TaskLog]:
+        """Worker-thread phase: record the result and clear the running flag.
+
+        Updates the pre-inserted "running" row when log_running_state is
+        on; otherwise this is the run's single task_logs INSERT.
+        """
+        completion = {
+            "status": result["status"],
+            "completed_at": result["completed_at"],
+            "duration_ms": result["duration_ms"],
+            "output": result["output"],
+            "error_message": result["error_message"],
+            "exit_code": result["exit_code"],
+        }
+        with self.session_factory() as db:
+            if info["log_id"] is not None:
+                # Straight to a compiled UPDATE: no identity-map load,
+                # no unit-of-work dirty tracking for a single known row
+                db.bulk_update_mappings(TaskLog, [{"id": info["log_id"], **completion}])
+                log = None
+            else:
+                log = TaskLog(
+                    task_id=task_id,
+                    task_name=info["name"],
+                    trigger_type=info["trigger_type"],
+                    started_at=info["run_at"],
+                    **completion
+                )
+                db.add(log)
+
+            values = {"is_running": False}
+            if next_run_time is not None:
+                values["next_run_at"] = next_run_time
+            db.execute(update(Task).where(Task.id == task_id).values(**values))
+            db.commit()
+
+            # Detach with attributes loaded so callers can read the row
+            # after the session closes
+            if log is None:
+                log = db.get(TaskLog, info["log_id"])
+            else:
+                db.refresh(log)
+            if log is not None:
+                db.expunge(log)
+            return log
+
+    def _clear_running_db(self, task_id: int):
+        """Worker-thread phase: reset is_running after a failed run"""
+        with self.session_factory() as db:
+            db.execute(update(Task).where(Task.id == task_id).values(is_running=False))
+            db.commit()
+
     async def run_task_now(self, task_id: int, trigger_type: str = "manual") -> Optional[TaskLog]:
         """Manually trigger a task execution"""
-        task = self.db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            return None
-        
-        if task_id in self._running_tasks:
+        lock = self._task_locks.setdefault(task_id, asyncio.Lock())
+        if lock.locked():
             raise ValueError("Task is already running")
-        
-        self._running_tasks.add(task_id)
-        
+        await lock.acquire()
+
         try:
-            task.is_running = True
-            task.last_run_at = datetime.utcnow()
-            task.run_count += 1
-            self.db.commit()
-            
-            log = TaskLog(
-                task_id=task.id,
-                task_name=task.name,
-                status="running",
-                trigger_type=trigger_type
-            )
-            self.db.add(log)
-            self.db.commit()
-            
-            result = await self.executor.execute(
-                task.id,
-                task.name,
-                TaskType(task.task_type),
-                task.config
+            info = await self._run_db(self._begin_run_db, task_id, trigger_type)
+            if info is None:
+                return None
+
+            task_type = _TASK_TYPES[info["task_type"]]
+            async with self._exec_sem(task_type):
+                result = await self.executor.execute(
+                    task_id,
+                    info["name"],
+                    task_type,
+                    info["config"]
+                )
+
+            log = await self._run_db(
+                self._finish_run_db, task_id, info, result, None
             )
-            
-            log.status = result["status"]
-            log.completed_at = result["completed_at"]
-            log.duration_ms = result["duration_ms"]
-            log.output = result["output"]
-            log.error_message = result["error_message"]
-            log.exit_code = result["exit_code"]
-            
-            if result["status"] == "success":
-                task.success_count += 1
-            else:
-                task.failure_count += 1
-            
-            task.is_running = False
-            self.db.commit()
-            
+
+            self._record_run(task_id, result["status"], info["run_at"])
+
             return log
-            
+
         finally:
-            self._running_tasks.discard(task_id)
-    
-    async def _send_notification(self, task: Task, result: dict):
+            lock.release()
+            self._task_locks.pop(task_id, None)
+
+    async def _send_notification_guarded(self, task_id: int, notification_email: str, result: dict):
+        """Run one notification under the concurrency cap, never raising."""
+        async with self._notif_sem:
+            try:
+                await self._send_notification(task_id, notification_email, result)
+            except Exception as e:
+                logger.error("Notification for task {} failed: {}", task_id, e)
+
+    async def _send_notification(self, task_id: int, notification_email: str, result: dict):
         """Send notification (placeholder implementation)"""
         # TODO: Implement email/webhook notification
-        logger.info(f"Would send notification for task {task.id} to {task.notification_email}")
+        logger.info("Would send notification for task {} to {}", task_id, notification_email)
     
     def get_scheduler_jobs(self) -> List[dict]:
         """Get all scheduled jobs"""
-        jobs = []
-        for job in self.scheduler.get_jobs():
-            jobs.append({
+        trigger_strs = self._trigger_strs
+        return [
+            {
                 "id": job.id,
                 "next_run_time": job.next_run_time,
-                "trigger": str(job.trigger)
-            })
-        return jobs
+                "trigger": trigger_strs.get(job.id) or str(job.trigger)
+            }
+            for job in self.scheduler.get_jobs()
+        ]
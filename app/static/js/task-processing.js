@@ -0,0 +1,362 @@
+// Task-processing Alpine component, shared via the app bundle so the
+// browser caches and parses it once instead of re-parsing an inline
+// script on every page load.
+document.addEventListener("alpine:init", () => {
+    Alpine.data("taskProcessingData", taskProcessingData);
+});
+
+// Static badge classes keyed by task type; looked up once at ingest
+// so rows bind plain strings instead of per-render object literals
+const TYPE_CLS = {
+    http: 'bg-blue-100 text-blue-800',
+    shell: 'bg-purple-100 text-purple-800',
+    python: 'bg-orange-100 text-orange-800',
+    backup: 'bg-teal-100 text-teal-800'
+};
+
+function taskProcessingData() {
+    return {
+        tasks: [],
+        filteredTasks: [],
+        searchQuery: '',
+        filterStatus: '',
+
+        // Cursor paging: pages are appended as the virtual list nears
+        // the end, so initial load is one page regardless of task count
+        taskPageSize: 50,
+        taskCursor: null,
+        taskHasMore: true,
+        taskLoadingMore: false,
+
+        // Windowed rendering: only ~viewport rows exist in the DOM;
+        // spacers keep the scrollbar geometry for the rest
+        taskScrollTop: 0,
+        taskRowHeight: 73,
+        taskViewport: 600,
+        msgScrollTop: 0,
+        msgRowHeight: 64,
+        msgViewport: 256,
+        overscan: 5,
+
+        // Extract modal
+        showExtractModal: false,
+        unprocessedMessages: [],
+        selectedMessages: new Set(),
+        extractedTasks: [],
+        isExtracting: false,
+        isCreating: false,
+        
+        // Create/Edit modal
+        showCreateModal: false,
+        showEditModal: false,
+        editingId: null,
+        form: {
+            name: '',
+            description: '',
+            task_type: 'shell',
+            cron_expression: '0 0 * * *',
+            is_enabled: true,
+            config: {}
+        },
+        
+        init() {
+            this.fetchTasks();
+            this.fetchUnprocessedMessages();
+        },
+
+        get taskStartIndex() {
+            return Math.max(0, Math.floor(this.taskScrollTop / this.taskRowHeight) - this.overscan);
+        },
+        get taskEndIndex() {
+            const visible = Math.ceil(this.taskViewport / this.taskRowHeight) + 2 * this.overscan;
+            return Math.min(this.filteredTasks.length, this.taskStartIndex + visible);
+        },
+        get visibleTasks() {
+            return this.filteredTasks.slice(this.taskStartIndex, this.taskEndIndex);
+        },
+        get taskTopPad() {
+            return this.taskStartIndex * this.taskRowHeight;
+        },
+        get taskBottomPad() {
+            return (this.filteredTasks.length - this.taskEndIndex) * this.taskRowHeight;
+        },
+
+        get msgStartIndex() {
+            return Math.max(0, Math.floor(this.msgScrollTop / this.msgRowHeight) - this.overscan);
+        },
+        get msgEndIndex() {
+            const visible = Math.ceil(this.msgViewport / this.msgRowHeight) + 2 * this.overscan;
+            return Math.min(this.unprocessedMessages.length, this.msgStartIndex + visible);
+        },
+        get visibleMessages() {
+            return this.unprocessedMessages.slice(this.msgStartIndex, this.msgEndIndex);
+        },
+        get msgTopPad() {
+            return this.msgStartIndex * this.msgRowHeight;
+        },
+        get msgBottomPad() {
+            return (this.unprocessedMessages.length - this.msgEndIndex) * this.msgRowHeight;
+        },
+
+        // rAF-coalesced scroll handlers: at most one reactive update per frame
+        onTaskScroll(event) {
+            if (this._taskScrollQueued) return;
+            this._taskScrollQueued = true;
+            requestAnimationFrame(() => {
+                this.taskScrollTop = event.target.scrollTop;
+                this._taskScrollQueued = false;
+                // Pull the next page before the spacer scrolls into view
+                if (this.taskHasMore && this.taskEndIndex >= this.filteredTasks.length - this.overscan) {
+                    this.loadMoreTasks();
+                }
+            });
+        },
+
+        onMsgScroll(event) {
+            if (this._msgScrollQueued) return;
+            this._msgScrollQueued = true;
+            requestAnimationFrame(() => {
+                this.msgScrollTop = event.target.scrollTop;
+                this._msgScrollQueued = false;
+            });
+        },
+
+        // Memoized per-row fields, computed once at ingest
+        decorateTask(t) {
+            t._preview = (t.description || '').substring(0, 100) + '...';
+            t._lastRunStr = t.last_run_at ? new Date(t.last_run_at).toLocaleString() : 'Never';
+            t._typeClass = TYPE_CLS[t.task_type] || 'bg-gray-100 text-gray-800';
+            t._statusClass = t.is_running ? 'bg-yellow-100 text-yellow-800'
+                : (t.is_active ? 'bg-green-100 text-green-800' : 'bg-gray-100 text-gray-800');
+            t._statusLabel = t.is_running ? 'Running' : (t.is_active ? 'Enabled' : 'Disabled');
+            return t;
+        },
+
+        async fetchTasks() {
+            // Reset paging state and load the first page
+            this.tasks = [];
+            this.filteredTasks = [];
+            this.taskCursor = null;
+            this.taskHasMore = true;
+            this.taskScrollTop = 0;
+            await this.loadMoreTasks();
+        },
+
+        async loadMoreTasks() {
+            if (this.taskLoadingMore || !this.taskHasMore) return;
+            this.taskLoadingMore = true;
+            try {
+                const params = new URLSearchParams({ limit: this.taskPageSize });
+                if (this.taskCursor !== null) params.set('cursor', this.taskCursor);
+                if (this.searchQuery) params.set('q', this.searchQuery);
+                if (this.filterStatus === 'enabled') params.set('is_active', 'true');
+                else if (this.filterStatus === 'disabled') params.set('is_active', 'false');
+
+                const response = await fetch('/api/tasks/?' + params);
+                const page = await response.json();
+                page.forEach(t => this.decorateTask(t));
+                this.tasks = this.tasks.concat(page);
+                // Filtering/search happens server-side now
+                this.filteredTasks = this.tasks;
+                if (page.length < this.taskPageSize) {
+                    this.taskHasMore = false;
+                } else {
+                    this.taskCursor = page[page.length - 1].id;
+                }
+            } catch (error) {
+                console.error('Failed to fetch tasks:', error);
+            } finally {
+                this.taskLoadingMore = false;
+            }
+        },
+        
+        async fetchUnprocessedMessages() {
+            try {
+                const response = await fetch('/api/messages/?is_processed=false');
+                this.unprocessedMessages = await response.json();
+            } catch (error) {
+                console.error('Failed to fetch messages:', error);
+            }
+        },
+        
+        filterTasks() {
+            // Search and status filters are query params; restart paging
+            this.fetchTasks();
+        },
+        
+        toggleMessageSelection(msg) {
+            // Keep a _selected flag on the row so bindings read a plain
+            // boolean instead of doing a Set lookup per row per render
+            if (this.selectedMessages.has(msg.id)) {
+                this.selectedMessages.delete(msg.id);
+                msg._selected = false;
+            } else {
+                this.selectedMessages.add(msg.id);
+                msg._selected = true;
+            }
+        },
+        
+        // Run fn over items with at most `limit` requests in flight, so
+        // N calls cost ~N/limit round-trips instead of N sequential ones
+        async mapLimit(items, limit, fn) {
+            const results = new Array(items.length);
+            let next = 0;
+            const workers = Array.from({ length: Math.min(limit, items.length) }, async () => {
+                while (next < items.length) {
+                    const i = next++;
+                    results[i] = await fn(items[i]);
+                }
+            });
+            await Promise.all(workers);
+            return results;
+        },
+
+        async extractTasks() {
+            if (this.selectedMessages.size === 0) return;
+
+            this.isExtracting = true;
+            this.extractedTasks = [];
+
+            try {
+                // O(1) lookups instead of an Array.find per selected id
+                const byId = new Map(this.unprocessedMessages.map(m => [m.id, m]));
+                const results = await this.mapLimit(Array.from(this.selectedMessages), 6, async (msgId) => {
+                    const msg = byId.get(msgId);
+                    if (!msg) return null;
+
+                    const response = await fetch('/api/ai/extract-tasks-from-message', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ message: msg })
+                    });
+                    return response.json();
+                });
+
+                for (const data of results) {
+                    if (data && data.success && data.tasks) {
+                        // Same _preview memoization as fetchTasks so the
+                        // review list never slices strings per render
+                        data.tasks.forEach(t => {
+                            t._preview = (t.description || '').substring(0, 150) + '...';
+                        });
+                        this.extractedTasks.push(...data.tasks);
+                    }
+                }
+            } catch (error) {
+                console.error('Failed to extract tasks:', error);
+                alert('Extraction failed. Please try again.');
+            } finally {
+                this.isExtracting = false;
+            }
+        },
+        
+        removeExtractedTask(index) {
+            this.extractedTasks.splice(index, 1);
+        },
+        
+        async createExtractedTasks() {
+            this.isCreating = true;
+            
+            try {
+                // One bulk call each instead of a request per task/message
+                await fetch('/api/tasks/bulk', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(this.extractedTasks)
+                });
+
+                // Mark messages as processed
+                await fetch('/api/messages/bulk', {
+                    method: 'PATCH',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ ids: Array.from(this.selectedMessages), is_processed: true })
+                });
+                
+                this.closeExtractModal();
+                this.fetchTasks();
+                this.fetchUnprocessedMessages();
+                alert(`Created ${this.extractedTasks.length} tasks successfully!`);
+                
+            } catch (error) {
+                console.error('Failed to create tasks:', error);
+                alert('Failed to create some tasks.');
+            } finally {
+                this.isCreating = false;
+            }
+        },
+        
+        async saveTask() {
+            const url = this.editingId ? `/api/tasks/${this.editingId}` : '/api/tasks/';
+            const method = this.editingId ? 'PUT' : 'POST';
+            
+            try {
+                const response = await fetch(url, {
+                    method: method,
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(this.form)
+                });
+                
+                if (response.ok) {
+                    this.closeModal();
+                    this.fetchTasks();
+                } else {
+                    alert('Save failed');
+                }
+            } catch (error) {
+                console.error('Failed to save task:', error);
+            }
+        },
+        
+        async runTask(id) {
+            try {
+                await fetch(`/api/tasks/${id}/run`, { method: 'POST' });
+                alert('Task started');
+            } catch (error) {
+                console.error('Failed to run task:', error);
+            }
+        },
+        
+        editTask(task) {
+            this.editingId = task.id;
+            this.form = { ...task };
+            this.showEditModal = true;
+        },
+        
+        async deleteTask(id) {
+            if (!confirm('Delete this task?')) return;
+            
+            try {
+                await fetch(`/api/tasks/${id}`, { method: 'DELETE' });
+                this.fetchTasks();
+            } catch (error) {
+                console.error('Failed to delete task:', error);
+            }
+        },
+        
+        closeModal() {
+            this.showCreateModal = false;
+            this.showEditModal = false;
+            this.editingId = null;
+            this.form = {
+                name: '',
+                description: '',
+                task_type: 'shell',
+                cron_expression: '0 0 * * *',
+                is_enabled: true,
+                config: {}
+            };
+        },
+        
+        closeExtractModal() {
+            this.showExtractModal = false;
+            this.selectedMessages = new Set();
+            this.unprocessedMessages.forEach(m => { m._selected = false; });
+            this.extractedTasks = [];
+        },
+        
+        formatDate(dateStr) {
+            if (!dateStr) return 'Never';
+            return new Date(dateStr).toLocaleString();
+        }
+    }
+}